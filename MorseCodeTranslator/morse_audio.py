@@ -0,0 +1,383 @@
+"""
+Render Morse code to WAV audio and decode it back.
+
+Dependencies:
+    pip install numpy
+
+Usage:
+    # Text to a 20 WPM, 600 Hz recording; Farnsworth spacing at an effective 12 WPM
+    python morse_audio.py render "CQ CQ DE TEST" -o cq.wav --wpm 20 --farnsworth 12
+
+    # A whole file, streamed (input already in dots and dashes with --morse)
+    python morse_audio.py render -i message.txt -o message.wav --tone 700
+    python morse_audio.py render -i message.morse --morse -o message.wav
+
+    # Decode a recording to text, or to dots and dashes
+    python morse_audio.py decode cq.wav
+    python morse_audio.py decode cq.wav --morse
+
+Audio is produced and consumed in blocks, so neither side holds a long
+recording in memory. Rendering concatenates one precomputed waveform per Morse
+code (sine tones with raised-cosine edges) and precomputed silences. Decoding
+finds the tone frequency, mixes each block down to an envelope of that tone
+alone, thresholds it between the noise floor and the loudest tone heard so far
+and run-length encodes it into tones and gaps;
+dot/dash and gap lengths are then told apart by clustering the durations of the
+most recent runs, which follows the sender's speed, Farnsworth spacing included.
+"""
+
+import argparse
+import math
+import sys
+import wave
+from collections import deque
+from io import StringIO
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from morse_translator import MorseDecoder, MorseEncoder, CHUNK_SIZE
+
+SAMPLE_RATE = 8000
+BLOCK_SIZE = 1 << 16
+RAMP_SECONDS = 0.005
+# Fewer marks than this and the dot/dash split is not trusted yet, so runs are held back
+MIN_MARKS = 16
+HISTORY = 512
+
+class Timing:
+    """Element lengths in samples for a character speed and an optional slower Farnsworth speed."""
+
+    def __init__(self, wpm: float = 20, farnsworth: float = None, sample_rate: int = SAMPLE_RATE):
+        # PARIS timing: a word of 50 units, so one unit lasts 1.2 / wpm seconds
+        self.unit = max(round(sample_rate * 1.2 / wpm), 1)
+        if farnsworth and farnsworth < wpm:
+            # ARRL Farnsworth: the extra time per PARIS word is spread over its 19 units of letter and word spacing
+            spacing = (60 * wpm - 37.2 * farnsworth) / (wpm * farnsworth) / 19 * sample_rate
+            self.char_gap, self.word_gap = round(3 * spacing), round(7 * spacing)
+        else:
+            self.char_gap, self.word_gap = 3 * self.unit, 7 * self.unit
+
+class MorseRenderer:
+    """Turns Morse text (codes separated by spaces, words by '/') into blocks of 16-bit PCM samples."""
+
+    def __init__(self, wpm: float = 20, farnsworth: float = None, tone: float = 600,
+                 sample_rate: int = SAMPLE_RATE, volume: float = 0.5):
+        self.timing = Timing(wpm, farnsworth, sample_rate)
+        self.sample_rate = sample_rate
+        unit = self.timing.unit
+        self.dot = self._tone(unit, tone, volume)
+        self.dash = self._tone(3 * unit, tone, volume)
+        self.element_gap = np.zeros(unit, np.int16)
+        self.char_gap = np.zeros(self.timing.char_gap, np.int16)
+        self.word_gap = np.zeros(self.timing.word_gap - self.timing.char_gap, np.int16)
+        self.codes = {}
+
+    def _tone(self, length: int, frequency: float, volume: float) -> np.ndarray:
+        t = np.arange(length) / self.sample_rate
+        envelope = np.ones(length)
+        # Raised-cosine edges keep keying clicks out of the spectrum
+        ramp = min(int(self.sample_rate * RAMP_SECONDS), length // 2)
+        if ramp:
+            edge = 0.5 - 0.5 * np.cos(np.pi * np.arange(ramp) / ramp)
+            envelope[:ramp] = edge
+            envelope[length - ramp:] = edge[::-1]
+        return (np.sin(2 * np.pi * frequency * t) * envelope * volume * 32767).astype(np.int16)
+
+    def _code(self, code: str) -> np.ndarray:
+        wave_ = self.codes.get(code)
+        if wave_ is None:
+            if code.strip('.-'):
+                raise ValueError(f"Not a Morse code: {code!r}")
+            parts = []
+            for symbol in code:
+                parts += [self.dot if symbol == '.' else self.dash, self.element_gap]
+            wave_ = self.codes[code] = np.concatenate(parts[:-1] + [self.char_gap])
+        return wave_
+
+    def _tokens(self, morse: Iterable[str]) -> Iterator[str]:
+        carry = ''
+        for chunk in [morse] if isinstance(morse, str) else morse:
+            chunk = carry + chunk
+            tokens = chunk.replace('\n', ' / ').split()
+            carry = ''
+            # A code cut at the end of the chunk is completed by the next one
+            if tokens and not chunk[-1].isspace() and not tokens[-1].strip('.-'):
+                carry = tokens.pop()
+            yield from tokens
+        if carry:
+            yield carry
+
+    def render(self, morse: Iterable[str], block_size: int = BLOCK_SIZE) -> Iterator[np.ndarray]:
+        """Yield int16 sample blocks of at least block_size (the last may be shorter) for chunks of Morse."""
+        pieces, size = [], 0
+        for token in self._tokens(morse):
+            piece = self.word_gap if token == '/' else self._code(token)
+            pieces.append(piece)
+            size += len(piece)
+            if size >= block_size:
+                yield np.concatenate(pieces)
+                pieces, size = [], 0
+        if pieces:
+            yield np.concatenate(pieces)
+
+def _encode_chunks(src, errors: str = 'warn') -> Iterator[str]:
+    encoder = MorseEncoder(errors)
+    for chunk in iter(lambda: src.read(CHUNK_SIZE), ''):
+        yield encoder.encode(chunk)
+    yield encoder.encode('', final=True)
+
+def write_wav(path: str, blocks: Iterable[np.ndarray], sample_rate: int = SAMPLE_RATE) -> int:
+    """Write mono 16-bit sample blocks to a WAV file as they come; return the number of samples."""
+    written = 0
+    with wave.open(path, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        for block in blocks:
+            out.writeframes(block.astype('<i2', copy=False).tobytes())
+            written += len(block)
+    return written
+
+def text_to_wav(text: str, path: str, **options) -> int:
+    """Render text as Morse audio in a WAV file; options go to MorseRenderer."""
+    renderer = MorseRenderer(**options)
+    return write_wav(path, renderer.render(_encode_chunks(StringIO(text))), renderer.sample_rate)
+
+def read_wav(path: str, block_size: int = BLOCK_SIZE) -> Iterator[tuple]:
+    """Yield (sample rate, float block in [-1, 1]) from a PCM WAV file, mixing channels down to mono."""
+    with wave.open(path, 'rb') as src:
+        rate, channels, width = src.getframerate(), src.getnchannels(), src.getsampwidth()
+        if width not in (1, 2, 4):
+            raise ValueError(f"{path}: unsupported sample width of {width} bytes")
+        while True:
+            data = src.readframes(block_size)
+            if not data:
+                break
+            if width == 1:
+                samples = (np.frombuffer(data, np.uint8).astype(np.float32) - 128) / 128
+            else:
+                dtype = '<i2' if width == 2 else '<i4'
+                samples = np.frombuffer(data, dtype).astype(np.float32) / float(1 << (8 * width - 1))
+            yield rate, samples.reshape(-1, channels).mean(axis=1)
+
+def _split(durations: np.ndarray) -> tuple:
+    """Two-means clustering of durations on a log scale: (threshold, low mean, high mean), or None for one cluster."""
+    values = np.log(durations)
+    low_end, high_end = values.min(), values.max()
+    # Closer than this and the durations are one kind of element with jitter, not two
+    if high_end - low_end < math.log(1.8):
+        return None
+    threshold = (low_end + high_end) / 2
+    for _ in range(20):
+        low, high = values[values <= threshold].mean(), values[values > threshold].mean()
+        updated = (low + high) / 2
+        if updated == threshold:
+            break
+        threshold = updated
+    return math.exp(threshold), math.exp(low), math.exp(high)
+
+def find_tone(samples: np.ndarray, sample_rate: int, low: float = 100, high: float = 4000) -> float:
+    """Frequency of a clearly dominant tone between low and high Hz, or None if there is none."""
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+    freqs = np.fft.rfftfreq(len(samples), 1 / sample_rate)
+    band = np.flatnonzero((freqs >= low) & (freqs <= min(high, sample_rate * 0.45)))
+    if len(band) < 3:
+        return None
+    i = band[np.argmax(spectrum[band])]
+    if spectrum[i] <= 8 * np.median(spectrum[band]) or not 0 < i < len(spectrum) - 1:
+        return None
+    # Parabolic interpolation between neighbouring bins
+    left, centre, right = np.log(spectrum[i - 1:i + 2] + 1e-12)
+    offset = 0.5 * (left - right) / (left - 2 * centre + right)
+    return float((i + offset) * sample_rate / len(samples))
+
+class MorseListener:
+    """Turns blocks of audio into Morse text: tone envelope, keying runs, then duration clustering."""
+
+    def __init__(self, sample_rate: int, smoothing: float = 0.01):
+        self.rate = sample_rate
+        self.window = max(int(sample_rate * smoothing), 1)
+        self.tone = None
+        self.waiting = []           # audio held until the tone frequency is known
+        self.untested = 0           # samples arrived since the tone was last looked for
+        self.position = 0           # samples mixed so far, so the oscillator phase runs on across blocks
+        self.tail = np.zeros(self.window - 1, complex)
+        self.peak = 0.0
+        self.noise = math.inf
+        self.keyed = False
+        self.run = 0                # length of the run still in progress
+        self.started = False        # silence before the first tone is not a gap
+        self.pending = []           # (tone?, length) runs not classified yet
+        self.merged = 0             # gap length taken back around a flicker, added to the next gap
+        self.marks = deque(maxlen=HISTORY)
+        self.gaps = deque(maxlen=HISTORY)
+
+    def _envelope(self, samples: np.ndarray) -> np.ndarray:
+        # Mixing the tone down to 0 Hz and averaging over the window is a narrow band-pass around it,
+        # which leaves out most of the noise a plain rectifier would let through
+        phase = (self.position * self.tone / self.rate) % 1
+        self.position += len(samples)
+        oscillator = np.exp(-2j * np.pi * (phase + np.arange(len(samples)) * (self.tone / self.rate)))
+        mixed = np.concatenate([self.tail, samples * oscillator])
+        self.tail = mixed[len(mixed) - self.window + 1:]
+        sums = np.concatenate([[0], np.cumsum(mixed)])
+        return np.abs(sums[self.window:] - sums[:-self.window]) / self.window
+
+    def _runs(self, samples: np.ndarray, final: bool = False) -> list:
+        if self.tone is None:
+            # Gather half a second of audio to find the tone in, with a few Hz of resolution
+            self.waiting.append(samples)
+            self.untested += len(samples)
+            if self.untested < self.rate // 2 and not final:
+                return []
+            samples = np.concatenate(self.waiting)
+            self.tone = find_tone(samples, self.rate) if len(samples) else None
+            if self.tone is None:
+                # Nothing but noise or silence so far: keep the last second, where a first faint mark may
+                # have begun, and look again a quarter of a second later
+                self.waiting = [samples[-self.rate:]]
+                self.untested = self.rate // 4
+                return []
+            self.waiting = []
+        envelope = self._envelope(samples)
+        if not len(envelope):
+            return []
+        self.peak = max(self.peak, float(envelope.max()))
+        self.noise = min(self.noise, float(np.percentile(envelope, 10)))
+        if self.peak < max(8 * self.noise, 1e-4):
+            keyed = np.zeros(len(envelope), bool)
+        else:
+            # Hysteresis: switch on above 60% of the way from the noise floor to the peak and off below 40%,
+            # so noise riding on a slow edge does not chatter into runs a few samples long
+            span = self.peak - self.noise
+            switch = np.where(envelope > self.noise + 0.6 * span, 1,
+                              np.where(envelope < self.noise + 0.4 * span, 0, -1))
+            last = np.maximum.accumulate(np.where(switch >= 0, np.arange(len(switch)), -1))
+            keyed = np.where(last >= 0, switch[np.maximum(last, 0)], int(self.keyed)).astype(bool)
+        edges = np.flatnonzero(keyed[1:] != keyed[:-1]) + 1
+        bounds = np.concatenate([[0], edges, [len(keyed)]])
+        lengths = np.diff(bounds)
+        states = keyed[bounds[:-1]]
+        runs = []
+        for state, length in zip(states.tolist(), lengths.tolist()):
+            if state == self.keyed:
+                self.run += length
+            else:
+                runs.append((self.keyed, self.run))
+                self.keyed, self.run = state, length
+        return runs
+
+    def _classify(self, runs: list) -> str:
+        tones = np.array([tone for tone, _ in runs], bool)
+        lengths = np.array([length for _, length in runs], np.float64)
+        marks = np.asarray(self.marks, np.float64)
+        split = _split(marks)
+        if split:
+            dash_threshold, unit = split[0], split[1]
+        else:
+            # Only one kind of mark so far: dots if they are about as long as the shortest gaps, else dashes
+            mark = marks.mean()
+            shortest_gap = np.percentile(np.asarray(self.gaps, np.float64), 10) if self.gaps else mark
+            unit = mark if mark < 2 * shortest_gap else mark / 3
+            dash_threshold = 2 * unit
+        gaps = np.asarray(self.gaps, np.float64)
+        boundaries = gaps[gaps > 2 * unit]
+        split = _split(boundaries) if len(boundaries) > 1 else None
+        # A single kind of boundary gap is taken for letter gaps: nearly every word has more than one letter
+        word_threshold = split[0] if split else max(5 * unit, 1.5 * boundaries.max(initial=0))
+        symbols = np.where(
+            tones,
+            np.where(lengths > dash_threshold, '-', '.'),
+            np.where(lengths > word_threshold, ' / ', np.where(lengths > 2 * unit, ' ', '')),
+        )
+        return ''.join(symbols.tolist())
+
+    def feed(self, samples: np.ndarray, final: bool = False) -> str:
+        """Return the Morse text completed by this block; with final, flush everything still held back."""
+        runs = self._runs(samples, final)
+        if final and self.keyed:
+            runs.append((True, self.run))
+            self.keyed, self.run = False, 0
+        for tone, length in runs:
+            if tone and length < self.window // 2:
+                # Shorter than the envelope can rise: a threshold flicker (typically while the peak is still
+                # being learnt), so it is folded into the gap around it
+                if self.pending and not self.pending[-1][0]:
+                    self.merged += self.pending.pop()[1] + length
+                    self.gaps.pop()
+                continue
+            if not self.started:
+                if not tone:
+                    continue
+                self.started = True
+            if not tone:
+                length, self.merged = length + self.merged, 0
+            (self.marks if tone else self.gaps).append(length)
+            self.pending.append((tone, length))
+        if not self.pending or (len(self.marks) < MIN_MARKS and not final):
+            return ''
+        # Every run here has ended; the silence after the last tone is still in progress and never becomes a gap
+        runs, self.pending = self.pending, []
+        return self._classify(runs)
+
+def listen(path: str, block_size: int = BLOCK_SIZE) -> Iterator[str]:
+    """Yield the Morse text heard in a WAV file, piece by piece as blocks are decoded."""
+    listener = None
+    for rate, samples in read_wav(path, block_size):
+        listener = listener or MorseListener(rate)
+        morse = listener.feed(samples)
+        if morse:
+            yield morse
+    if listener:
+        morse = listener.feed(np.zeros(0, np.float32), final=True)
+        if morse:
+            yield morse
+
+def wav_to_text(path: str, errors: str = 'warn') -> str:
+    decoder = MorseDecoder(errors)
+    return ''.join(decoder.decode(morse) for morse in listen(path)) + decoder.decode('', final=True)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render Morse code to WAV audio and decode it back")
+    sub = parser.add_subparsers(dest='command', required=True)
+    render = sub.add_parser('render', help="Text (or Morse with --morse) to a WAV file")
+    render.add_argument('text', nargs='?', help="Text to render (default: read --input)")
+    render.add_argument('-i', '--input', default='-', help="Input file ('-' for stdin)")
+    render.add_argument('-o', '--output', required=True, help="WAV file to write")
+    render.add_argument('--morse', action='store_true', help="Input is already Morse code")
+    render.add_argument('--wpm', type=float, default=20, help="Character speed in words per minute (default: 20)")
+    render.add_argument('--farnsworth', type=float, default=None,
+                        help="Effective speed in WPM, stretching the gaps between characters and words")
+    render.add_argument('--tone', type=float, default=600, help="Tone frequency in Hz (default: 600)")
+    render.add_argument('--rate', type=int, default=SAMPLE_RATE, help=f"Sample rate (default: {SAMPLE_RATE})")
+    render.add_argument('--volume', type=float, default=0.5, help="Amplitude from 0 to 1 (default: 0.5)")
+    decode = sub.add_parser('decode', help="A WAV file to text (or Morse with --morse)")
+    decode.add_argument('wav', help="WAV file to decode")
+    decode.add_argument('--morse', action='store_true', help="Print the Morse code instead of text")
+    for command in (render, decode):
+        command.add_argument('--errors', choices=['warn', 'strict', 'replace', 'ignore'], default='warn',
+                             help="What to do with characters or codes that have no translation")
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'render':
+            src = StringIO(args.text) if args.text is not None else \
+                sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+            with src:
+                chunks = iter(lambda: src.read(CHUNK_SIZE), '') if args.morse else _encode_chunks(src, args.errors)
+                renderer = MorseRenderer(args.wpm, args.farnsworth, args.tone, args.rate, args.volume)
+                samples = write_wav(args.output, renderer.render(chunks), args.rate)
+            print(f"Wrote {samples / args.rate:.1f} s of audio to {args.output}")
+        else:
+            decoder = MorseDecoder(args.errors)
+            for morse in listen(args.wav):
+                sys.stdout.write(morse if args.morse else decoder.decode(morse))
+            if not args.morse:
+                sys.stdout.write(decoder.decode('', final=True))
+            print()
+    except (ValueError, wave.Error) as e:
+        sys.exit(f"Error: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,239 @@
-MORSE_CODE_DICT = {
-    'A': '.-', 'B': '-...', 'C': '-.-.', 'D': '-..', 'E': '.',
-    'F': '..-.', 'G': '--.', 'H': '....', 'I': '..', 'J': '.---',
-    'K': '-.-', 'L': '.-..', 'M': '--', 'N': '-.', 'O': '---',
-    'P': '.--.', 'Q': '--.-', 'R': '.-.', 'S': '...', 'T': '-',
-    'U': '..-', 'V': '...-', 'W': '.--', 'X': '-..-', 'Y': '-.--',
-    'Z': '--..',
-    '0': '-----', '1': '.----', '2': '..---', '3': '...--',
-    '4': '....-', '5': '.....', '6': '-....', '7': '--...',
-    '8': '---..', '9': '----.',
-    ',': '--..--', '.': '.-.-.-', '?': '..--..', '/': '-..-.',
-    '-': '-....-', '(': '-.--.', ')': '-.--.-', '!': '-.-.--',
-    ':': '---...', ';': '-.-.-.', "'": '.----.', '&': '.-...',
-    '=': '-...-', '+': '.-.-.', '_': '..--.-', '"': '.-..-.',
-    '$': '...-..-', '@': '.--.-.'
-}
-
-MORSE_CODE_DICT_REVERSED = {value: key for key, value in MORSE_CODE_DICT.items()}
-
-def text_to_morse(text: str) -> str:
-    text = text.upper()
-    morse_code = []
-    for word in text.split(" "):  
-        morse_word = []
-        for char in word:
-            if char in MORSE_CODE_DICT:
-                morse_word.append(MORSE_CODE_DICT[char])
-        morse_code.append(" ".join(morse_word))
-    return " / ".join(morse_code)  
-
-def morse_to_text(morse: str) -> str:
-    text = []
-    words = morse.split(" / ") 
-    for word in words:
-        letters = word.split()
-        decoded_word = ""
-        for letter in letters:
-            decoded_word += MORSE_CODE_DICT_REVERSED.get(letter, "")
-        text.append(decoded_word)
-    return " ".join(text)
-
-if __name__ == "__main__":
-    text = "Hello World"
-    encoded = text_to_morse(text)
-    print("Text to Morse:", encoded)
-
-    morse = ".... . .-.. .-.. --- / .-- --- .-. .-.. -.."
-    decoded = morse_to_text(morse)
-    print("Morse to Text:", decoded)
\ No newline at end of file
+"""
+Translate text to Morse code and back.
+
+Usage:
+    # Encode or decode a string
+    python morse_translator.py encode "Hello World"
+    python morse_translator.py decode ".... . .-.. .-.. --- / .-- --- .-. .-.. -.."
+
+    # Large files are streamed in chunks; '-' or no --input reads stdin
+    python morse_translator.py encode -i book.txt -o book.morse
+    python morse_translator.py decode -i book.morse --errors replace
+
+    # Compare throughput with the old per-letter implementation
+    python morse_translator.py --benchmark
+
+Letters are separated by a space and words by " / "; line breaks are kept.
+Characters (or codes) with no translation are dropped with a warning by default;
+--errors strict stops at them, replace writes "........" (the Morse error
+signal) or U+FFFD in their place, and ignore drops them silently.
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+import warnings
+from io import StringIO
+from typing import TextIO
+
+MORSE_CODE_DICT = {
+    'A': '.-', 'B': '-...', 'C': '-.-.', 'D': '-..', 'E': '.',
+    'F': '..-.', 'G': '--.', 'H': '....', 'I': '..', 'J': '.---',
+    'K': '-.-', 'L': '.-..', 'M': '--', 'N': '-.', 'O': '---',
+    'P': '.--.', 'Q': '--.-', 'R': '.-.', 'S': '...', 'T': '-',
+    'U': '..-', 'V': '...-', 'W': '.--', 'X': '-..-', 'Y': '-.--',
+    'Z': '--..',
+    '0': '-----', '1': '.----', '2': '..---', '3': '...--',
+    '4': '....-', '5': '.....', '6': '-....', '7': '--...',
+    '8': '---..', '9': '----.',
+    ',': '--..--', '.': '.-.-.-', '?': '..--..', '/': '-..-.',
+    '-': '-....-', '(': '-.--.', ')': '-.--.-', '!': '-.-.--',
+    ':': '---...', ';': '-.-.-.', "'": '.----.', '&': '.-...',
+    '=': '-...-', '+': '.-.-.', '_': '..--.-', '"': '.-..-.',
+    '$': '...-..-', '@': '.--.-.'
+}
+
+MORSE_CODE_DICT_REVERSED = {value: key for key, value in MORSE_CODE_DICT.items()}
+
+ERROR_SIGNAL = '........'
+ERRORS = ('warn', 'strict', 'replace', 'ignore')
+CHUNK_SIZE = 1 << 20
+
+# str.translate table: every code is written with a leading space, so letters come out space-separated and a
+# space or tab becomes " /"; the space left at the start of each line is trimmed afterwards
+ENCODE_TABLE = {ord(char): ' ' + code for char, code in MORSE_CODE_DICT.items()}
+ENCODE_TABLE.update({ord(char.lower()): ' ' + code for char, code in MORSE_CODE_DICT.items() if char.isalpha()})
+ENCODE_TABLE.update({ord(' '): ' /', ord('\t'): ' /', ord('\n'): '\n', ord('\r'): ''})
+UNENCODABLE_RE = re.compile('[^' + re.escape(''.join(map(chr, ENCODE_TABLE))) + ']')
+DECODE_TABLE = dict(MORSE_CODE_DICT_REVERSED, **{'/': ' '})
+
+def _check_errors(errors: str) -> str:
+    if errors not in ERRORS:
+        raise ValueError(f"errors must be one of {', '.join(ERRORS)}, not {errors!r}")
+    return errors
+
+def _warn_unknown(kind: str, unknown: set) -> None:
+    shown = ', '.join(repr(symbol) for symbol in sorted(unknown)[:10])
+    more = f" and {len(unknown) - 10} more" if len(unknown) > 10 else ""
+    warnings.warn(f"Skipped {kind} with no translation: {shown}{more}", stacklevel=3)
+
+class MorseEncoder:
+    """Incremental text-to-Morse encoder: chunks fed in order encode exactly like their concatenation."""
+
+    def __init__(self, errors: str = 'warn'):
+        self.errors = _check_errors(errors)
+        self.unknown = set()
+        self.line_start = True
+
+    def encode(self, text: str, final: bool = False) -> str:
+        table = ENCODE_TABLE
+        unknown = set(UNENCODABLE_RE.findall(text))
+        if unknown:
+            if self.errors == 'strict':
+                raise ValueError(f"No Morse code for {', '.join(repr(char) for char in sorted(unknown))}")
+            self.unknown |= unknown
+            replacement = ' ' + ERROR_SIGNAL if self.errors == 'replace' else ''
+            table = {**ENCODE_TABLE, **{ord(char): replacement for char in unknown}}
+        morse = text.translate(table).replace('\n ', '\n')
+        if self.line_start and morse.startswith(' '):
+            morse = morse[1:]
+        if morse:
+            self.line_start = morse.endswith('\n')
+        if final and self.unknown and self.errors == 'warn':
+            _warn_unknown("characters", self.unknown)
+        return morse
+
+class MorseDecoder:
+    """Incremental Morse-to-text decoder; a code split across chunks is held back until it is complete."""
+
+    def __init__(self, errors: str = 'warn'):
+        self.errors = _check_errors(errors)
+        self.unknown = set()
+        self.carry = ''
+
+    def _decode_tokens(self, tokens: list) -> str:
+        letters = []
+        for token in tokens:
+            letter = DECODE_TABLE.get(token)
+            if letter is None:
+                if self.errors == 'strict':
+                    raise ValueError(f"Unknown Morse code {token!r}")
+                self.unknown.add(token)
+                letter = '\ufffd' if self.errors == 'replace' else ''
+            letters.append(letter)
+        return ''.join(letters)
+
+    def decode(self, morse: str, final: bool = False) -> str:
+        morse = self.carry + morse
+        self.carry = ''
+        if not final and morse and not morse[-1].isspace():
+            cut = max(morse.rfind(' '), morse.rfind('\n'), morse.rfind('\t')) + 1
+            morse, self.carry = morse[:cut], morse[cut:]
+        lines = morse.split('\n')
+        try:
+            text = '\n'.join([''.join(map(DECODE_TABLE.__getitem__, line.split())) for line in lines])
+        except KeyError:
+            text = '\n'.join([self._decode_tokens(line.split()) for line in lines])
+        if final and self.unknown and self.errors == 'warn':
+            _warn_unknown("codes", self.unknown)
+        return text
+
+def text_to_morse(text: str, errors: str = 'warn') -> str:
+    return MorseEncoder(errors).encode(text, final=True)
+
+def morse_to_text(morse: str, errors: str = 'warn') -> str:
+    return MorseDecoder(errors).decode(morse, final=True)
+
+def encode_stream(src: TextIO, dst: TextIO, errors: str = 'warn', chunk_size: int = CHUNK_SIZE) -> None:
+    """Encode a text stream to Morse chunk by chunk, so neither side has to fit in memory."""
+    encoder = MorseEncoder(errors)
+    for chunk in iter(lambda: src.read(chunk_size), ''):
+        dst.write(encoder.encode(chunk))
+    dst.write(encoder.encode('', final=True))
+
+def decode_stream(src: TextIO, dst: TextIO, errors: str = 'warn', chunk_size: int = CHUNK_SIZE) -> None:
+    """Decode a Morse stream to text chunk by chunk, so neither side has to fit in memory."""
+    decoder = MorseDecoder(errors)
+    for chunk in iter(lambda: src.read(chunk_size), ''):
+        dst.write(decoder.decode(chunk))
+    dst.write(decoder.decode('', final=True))
+
+def _legacy_text_to_morse(text: str) -> str:
+    morse_code = []
+    for word in text.upper().split(" "):
+        morse_code.append(" ".join(MORSE_CODE_DICT[char] for char in word if char in MORSE_CODE_DICT))
+    return " / ".join(morse_code)
+
+def _legacy_morse_to_text(morse: str) -> str:
+    text = []
+    for word in morse.split(" / "):
+        decoded_word = ""
+        for letter in word.split():
+            decoded_word += MORSE_CODE_DICT_REVERSED.get(letter, "")
+        text.append(decoded_word)
+    return " ".join(text)
+
+def run_benchmark(size_mb: float = 5) -> None:
+    """Time the table-driven codec, one-shot and streamed, against the old per-letter loops."""
+    rng = random.Random(0)
+    words = ["the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog", "Hello,", "world!", "42", "(test)",
+             "Morse", "code", "is", "a", "method", "of", "encoding", "text", "characters", "signal", "durations."]
+    lines, total = [], 0
+    while total < size_mb * 1e6:
+        line = " ".join(rng.choices(words, k=rng.randrange(5, 15)))
+        lines.append(line)
+        total += len(line) + 1
+    text = "\n".join(lines)
+    morse = text_to_morse(text)
+    one_line = text.replace("\n", " ")
+
+    def streamed(func, data):
+        out = StringIO()
+        func(StringIO(data), out)
+        return out.getvalue()
+
+    cases = [
+        ("encode", text_to_morse, text),
+        ("encode streamed", lambda t: streamed(encode_stream, t), text),
+        ("encode (old)", _legacy_text_to_morse, one_line),
+        ("decode", morse_to_text, morse),
+        ("decode streamed", lambda m: streamed(decode_stream, m), morse),
+        ("decode (old)", _legacy_morse_to_text, _legacy_text_to_morse(one_line)),
+    ]
+    print(f"{'Case':<18} {'Input':>9} {'MB/s':>8}")
+    for name, func, data in cases:
+        start = time.perf_counter()
+        func(data)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<18} {len(data) / 1e6:>7.2f}MB {len(data) / 1e6 / elapsed:>8.2f}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Translate text to Morse code and back")
+    parser.add_argument('mode', nargs='?', choices=['encode', 'decode'], help="Direction of translation")
+    parser.add_argument('text', nargs='?', help="Text or Morse to translate (default: read --input)")
+    parser.add_argument('-i', '--input', default='-', help="Input file ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-', help="Output file ('-' for stdout)")
+    parser.add_argument('--errors', choices=ERRORS, default='warn',
+                        help="What to do with characters or codes that have no translation (default: warn)")
+    parser.add_argument('--benchmark', action='store_true', help="Benchmark the codec on megabytes of text")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        run_benchmark()
+        return
+    if not args.mode:
+        text = "Hello World"
+        print("Text to Morse:", text_to_morse(text))
+        morse = ".... . .-.. .-.. --- / .-- --- .-. .-.. -.."
+        print("Morse to Text:", morse_to_text(morse))
+        return
+
+    stream = encode_stream if args.mode == 'encode' else decode_stream
+    src = StringIO(args.text) if args.text is not None else \
+        sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    dst = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        stream(src, dst, args.errors)
+        if args.text is not None and dst is sys.stdout:
+            print()
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+    finally:
+        for f in (src, dst):
+            if f not in (sys.stdin, sys.stdout):
+                f.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,24 @@
+import argparse
+import bisect
+import datetime
+import hashlib
+import heapq
+import math
+import mmap
+import os
 import re
-import random
+import secrets
 import string
-from typing import Tuple, List
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, Tuple, List
 
 COMMON_PASSWORDS = {
     'password', 'password123', '123456', '12345678', 'qwerty', 'abc123',
@@ -11,7 +28,600 @@ COMMON_PASSWORDS = {
     'football', 'welcome', 'jesus', 'ninja', 'mustang', 'password1'
 }
 
-def evaluate_password_strength(password: str) -> Tuple[str, int, List[str]]:
+COMMON_PASSWORD_MESSAGE = "This is a commonly used password. Choose something unique"
+
+# On-disk blocklist formats. Both are built once from a plain wordlist (one
+# password per line) and then opened read-only through mmap, so every process
+# that opens the same file shares its pages through the OS page cache.
+HASHFILE_MAGIC = b'PWHASH1\0'
+BLOOM_MAGIC = b'PWBLOOM1'
+HASHFILE_HEADER = struct.Struct('<8sBxxxxxxxQ')   # magic, byteorder, count
+BLOOM_HEADER = struct.Struct('<8sQI4x')            # magic, bit count, hash count
+SORT_RUN_SIZE = 4_000_000
+
+
+def _normalize(password: str) -> bytes:
+    return password.lower().encode('utf-8', 'surrogatepass')
+
+
+def _hash64(password: str) -> int:
+    return int.from_bytes(hashlib.blake2b(_normalize(password), digest_size=8).digest(), 'little')
+
+
+def _read_wordlist(path: str) -> Iterator[str]:
+    with open(path, 'rb') as f:
+        for line in f:
+            word = line.rstrip(b'\r\n')
+            if word:
+                yield word.decode('utf-8', 'replace')
+
+
+class HashFileBlocklist:
+    """Sorted array of 64-bit password hashes, binary-searched through mmap."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, order, count = HASHFILE_HEADER.unpack_from(self._mm)
+        if magic != HASHFILE_MAGIC:
+            raise ValueError(f"{path} is not a password hash file")
+        if order != (sys.byteorder == 'little'):
+            raise ValueError(f"{path} was built on a machine with a different byte order")
+        end = HASHFILE_HEADER.size + count * 8
+        self._hashes = memoryview(self._mm)[HASHFILE_HEADER.size:end].cast('Q')
+
+    def __contains__(self, password: str) -> bool:
+        h = _hash64(password)
+        i = bisect.bisect_left(self._hashes, h)
+        return i < len(self._hashes) and self._hashes[i] == h
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __reduce__(self):
+        # Re-open by path in the receiving process instead of copying the data.
+        return (open_blocklist, (self.path,))
+
+    def close(self):
+        self._hashes.release()
+        self._mm.close()
+
+
+class BloomBlocklist:
+    """Bloom filter over the wordlist; may report false positives, never false negatives."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.num_bits, self.num_hashes = BLOOM_HEADER.unpack_from(self._mm)
+        if magic != BLOOM_MAGIC:
+            raise ValueError(f"{path} is not a password Bloom filter")
+
+    def __contains__(self, password: str) -> bool:
+        mm = self._mm
+        offset = BLOOM_HEADER.size
+        for bit in _bloom_bits(password, self.num_bits, self.num_hashes):
+            if not mm[offset + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def __reduce__(self):
+        return (open_blocklist, (self.path,))
+
+    def close(self):
+        self._mm.close()
+
+
+def _bloom_bits(password: str, num_bits: int, num_hashes: int) -> Iterator[int]:
+    # Kirsch-Mitzenmacher double hashing: one digest yields all k positions.
+    digest = hashlib.blake2b(_normalize(password), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], 'little')
+    h2 = int.from_bytes(digest[8:], 'little') | 1
+    for i in range(num_hashes):
+        yield (h1 + i * h2) % num_bits
+
+
+def open_blocklist(path: str):
+    with open(path, 'rb') as f:
+        magic = f.read(8)
+    if magic == HASHFILE_MAGIC:
+        return HashFileBlocklist(path)
+    if magic == BLOOM_MAGIC:
+        return BloomBlocklist(path)
+    raise ValueError(f"{path} is not a recognised blocklist file")
+
+
+def _iter_run(path: str, block: int = 65536) -> Iterator[int]:
+    with open(path, 'rb') as f:
+        while True:
+            chunk = array('Q')
+            try:
+                chunk.fromfile(f, block)
+            except EOFError:
+                pass
+            if not chunk:
+                return
+            yield from chunk
+
+
+def build_hash_file(wordlist: str, out_path: str, run_size: int = SORT_RUN_SIZE) -> int:
+    """Build a sorted hash file from a wordlist of any size using an external merge sort."""
+    runs = []
+    tmpdir = tempfile.mkdtemp(prefix='pwhash-', dir=os.path.dirname(os.path.abspath(out_path)))
+    try:
+        pending = []
+        for word in _read_wordlist(wordlist):
+            pending.append(_hash64(word))
+            if len(pending) >= run_size:
+                runs.append(_write_run(tmpdir, len(runs), pending))
+                pending = []
+        if pending or not runs:
+            runs.append(_write_run(tmpdir, len(runs), pending))
+
+        count = 0
+        last = None
+        buf = array('Q')
+        with open(out_path, 'wb') as out:
+            out.write(HASHFILE_HEADER.pack(HASHFILE_MAGIC, sys.byteorder == 'little', 0))
+            for h in heapq.merge(*(_iter_run(r) for r in runs)):
+                if h == last:
+                    continue
+                buf.append(h)
+                last = h
+                if len(buf) >= 65536:
+                    buf.tofile(out)
+                    count += len(buf)
+                    del buf[:]
+            buf.tofile(out)
+            count += len(buf)
+            out.seek(0)
+            out.write(HASHFILE_HEADER.pack(HASHFILE_MAGIC, sys.byteorder == 'little', count))
+    finally:
+        for r in runs:
+            os.remove(r)
+        os.rmdir(tmpdir)
+    return count
+
+
+def _write_run(tmpdir: str, index: int, hashes: List[int]) -> str:
+    path = os.path.join(tmpdir, f'run{index}')
+    with open(path, 'wb') as f:
+        array('Q', sorted(hashes)).tofile(f)
+    return path
+
+
+def build_bloom_filter(wordlist: str, out_path: str, error_rate: float = 0.001) -> int:
+    """Build a Bloom filter sized for the wordlist and the requested false-positive rate."""
+    count = sum(1 for _ in _read_wordlist(wordlist))
+    n = max(count, 1)
+    num_bits = max(64, int(-n * math.log(error_rate) / (math.log(2) ** 2)))
+    num_bits = (num_bits + 7) & ~7
+    num_hashes = max(1, round(num_bits / n * math.log(2)))
+
+    bits = bytearray(num_bits // 8)
+    for word in _read_wordlist(wordlist):
+        for bit in _bloom_bits(word, num_bits, num_hashes):
+            bits[bit >> 3] |= 1 << (bit & 7)
+
+    with open(out_path, 'wb') as out:
+        out.write(BLOOM_HEADER.pack(BLOOM_MAGIC, num_bits, num_hashes))
+        out.write(bits)
+    return count
+
+
+# Entropy-based estimator, modelled on zxcvbn. Every dictionary word, l33t
+# variant, keyboard walk, sequence, repeat and date in the password is found
+# first; dynamic programming then picks the segmentation that needs the fewest
+# guesses. Lookup tables are built once at import time.
+RANKED_WORDS = (
+    'password', '123456', '12345678', 'qwerty', '123456789', '12345', '1234',
+    '111111', '1234567', 'dragon', '123123', 'baseball', 'abc123', 'football',
+    'monkey', 'letmein', '696969', 'shadow', 'master', '666666', 'qwertyuiop',
+    '123321', 'mustang', '1234567890', 'michael', '654321', 'superman',
+    'qazwsx', '7777777', '121212', '000000', 'qwerty123', 'killer', 'trustno1',
+    'jordan', 'jennifer', 'hunter', 'buster', 'soccer', 'harley', 'batman',
+    'andrew', 'tigger', 'sunshine', 'iloveyou', 'fuckyou', 'charlie', 'robert',
+    'thomas', 'hockey', 'ranger', 'daniel', 'starwars', 'klaster', '112233',
+    'george', 'computer', 'michelle', 'jessica', 'pepper', 'zxcvbnm', 'ashley',
+    'bailey', 'passw0rd', 'welcome', 'jesus', 'ninja', 'princess', 'admin',
+    'login', 'dragon', 'access', 'flower', 'cheese', 'summer', 'winter',
+    'secret', 'love', 'god', 'sex', 'money', 'freedom', 'whatever', 'nicole',
+)
+ENGLISH_WORDS = (
+    'the', 'of', 'and', 'to', 'in', 'is', 'you', 'that', 'it', 'he', 'was',
+    'for', 'on', 'are', 'as', 'with', 'his', 'they', 'at', 'be', 'this', 'have',
+    'from', 'or', 'one', 'had', 'by', 'word', 'but', 'not', 'what', 'all',
+    'were', 'we', 'when', 'your', 'can', 'said', 'there', 'use', 'each', 'which',
+    'she', 'do', 'how', 'their', 'if', 'will', 'up', 'other', 'about', 'out',
+    'many', 'then', 'them', 'these', 'some', 'her', 'would', 'make', 'like',
+    'him', 'into', 'time', 'has', 'look', 'two', 'more', 'write', 'go', 'see',
+    'number', 'no', 'way', 'could', 'people', 'my', 'than', 'first', 'water',
+    'been', 'call', 'who', 'oil', 'its', 'now', 'find', 'long', 'down', 'day',
+    'did', 'get', 'come', 'made', 'may', 'part', 'horse', 'battery', 'staple',
+    'correct', 'house', 'world', 'hello', 'dog', 'cat', 'blue', 'green', 'red',
+    'black', 'white', 'sun', 'moon', 'star', 'fire', 'king', 'queen', 'angel',
+    'baby', 'girl', 'boy', 'life', 'happy', 'family', 'music', 'friend',
+)
+
+L33T_SUBSTITUTIONS = {'4': 'a', '@': 'a', '8': 'b', '(': 'c', '{': 'c', '3': 'e',
+                      '6': 'g', '9': 'g', '1': 'i', '!': 'i', '|': 'i', '0': 'o',
+                      '$': 's', '5': 's', '7': 't', '+': 't', '%': 'x', '2': 'z'}
+# '1', '!', '|' and '7' are ambiguous, so a second table reads them as 'l'.
+L33T_TABLES = (
+    str.maketrans(L33T_SUBSTITUTIONS),
+    str.maketrans(dict(L33T_SUBSTITUTIONS, **{'1': 'l', '!': 'l', '|': 'l', '7': 'l'})),
+)
+
+QWERTY_ROWS = ('`1234567890-=', 'qwertyuiop[]\\', "asdfghjkl;'", 'zxcvbnm,./')
+QWERTY_SHIFTED = ('~!@#$%^&*()_+', 'QWERTYUIOP{}|', 'ASDFGHJKL:"', 'ZXCVBNM<>?')
+# Staggered rows: above is (col, col + 1), below is (col - 1, col).
+_KEY_DIRECTIONS = ((0, -1), (0, 1), (-1, 0), (-1, 1), (1, -1), (1, 0))
+
+DATE_RE = re.compile(r'(\d{1,4})([\s/\\_.-])(\d{1,2})\2(\d{1,4})')
+DIGITS_RE = re.compile(r'\d{4,8}')
+REPEAT_GREEDY_RE = re.compile(r'(.+)\1+')
+REPEAT_LAZY_RE = re.compile(r'(.+?)\1+')
+REFERENCE_YEAR = datetime.date.today().year
+MIN_YEAR_SPACE = 20
+ENTROPY_SCORE_THRESHOLDS = (1e3, 1e6, 1e8, 1e10)
+
+Match = namedtuple('Match', 'i j pattern token guesses')
+
+
+def _rank_table(words: Iterable[str]) -> dict:
+    ranks = {}
+    for rank, word in enumerate(words, 1):
+        ranks.setdefault(word, rank)
+    return ranks
+
+
+RANKED_DICTIONARIES = {
+    'passwords': _rank_table(RANKED_WORDS + tuple(sorted(COMMON_PASSWORDS))),
+    'english': _rank_table(ENGLISH_WORDS),
+}
+# All dictionaries merged into one word -> best rank table, so matching costs a
+# single dict lookup per substring.
+_word_ranks = {}
+_max_word_len = 0
+
+
+def _merge_dictionaries():
+    global _max_word_len
+    _word_ranks.clear()
+    for ranks in RANKED_DICTIONARIES.values():
+        for word, rank in ranks.items():
+            if rank < _word_ranks.get(word, math.inf):
+                _word_ranks[word] = rank
+    _max_word_len = max(map(len, _word_ranks), default=0)
+
+
+_merge_dictionaries()
+
+
+def load_ranked_dictionary(name: str, path: str, limit: int = None):
+    """Load a frequency-ranked wordlist (most common first) as an extra dictionary."""
+    words = (w.lower() for w in _read_wordlist(path))
+    if limit:
+        words = (w for _, w in zip(range(limit), words))
+    RANKED_DICTIONARIES[name] = _rank_table(words)
+    _merge_dictionaries()
+    estimate_strength.cache_clear()
+
+
+def _build_keyboard_graph():
+    positions = {}
+    for r, (row, shifted) in enumerate(zip(QWERTY_ROWS, QWERTY_SHIFTED)):
+        for c, (key, shifted_key) in enumerate(zip(row, shifted)):
+            positions[key] = positions[shifted_key] = (r, c)
+    grid = {pos: key for key, pos in positions.items() if key in ''.join(QWERTY_ROWS)}
+    graph = {}
+    for key, (r, c) in positions.items():
+        graph[key] = {}
+        for d, (dr, dc) in enumerate(_KEY_DIRECTIONS):
+            neighbour = grid.get((r + dr, c + dc))
+            if neighbour:
+                graph[key][neighbour] = d
+                graph[key][QWERTY_SHIFTED[r + dr][c + dc]] = d
+    return graph
+
+
+KEYBOARD_GRAPH = _build_keyboard_graph()
+_SHIFTED_KEYS = frozenset(''.join(QWERTY_SHIFTED)) - set(string.ascii_lowercase + string.digits)
+_KEYBOARD_STARTS = len(''.join(QWERTY_ROWS))
+_KEYBOARD_DEGREE = sum(len(v) for v in KEYBOARD_GRAPH.values()) / len(KEYBOARD_GRAPH) / 2
+
+
+def _variations(a: int, b: int) -> int:
+    if a == 0 or b == 0:
+        return 2
+    return sum(math.comb(a + b, i) for i in range(1, min(a, b) + 1))
+
+
+def _uppercase_variations(token: str) -> int:
+    if token.islower() or token.lower() == token:
+        return 1
+    if token.isupper() or (token[0].isupper() and token[1:].lower() == token[1:]) \
+            or (token[-1].isupper() and token[:-1].lower() == token[:-1]):
+        return 2
+    upper = sum(ch.isupper() for ch in token)
+    lower = sum(ch.islower() for ch in token)
+    return _variations(upper, lower)
+
+
+def _lower_aligned(text: str) -> str:
+    """Lowercase character by character, keeping those whose lowercase is longer (e.g. 'İ') so positions line up."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return ''.join(low if len(low) == 1 else ch for ch, low in zip(text, map(str.lower, text)))
+
+
+def _l33t_variations(token: str, word: str) -> int:
+    total = 1
+    lowered = _lower_aligned(token)
+    for subbed in set(lowered) - set(word):
+        plain = word[lowered.index(subbed)]
+        s = lowered.count(subbed)
+        u = lowered.count(plain)
+        total *= _variations(s, u) if u else 2
+    return total
+
+
+def _dictionary_matches(password: str) -> List[Match]:
+    matches = []
+    lowered = _lower_aligned(password)
+    candidates = [(lowered, False, False)]
+    for table in L33T_TABLES:
+        translated = lowered.translate(table)
+        if translated != lowered:
+            candidates.append((translated, True, False))
+    candidates.append((lowered[::-1], False, True))
+
+    n = len(password)
+    seen = set()
+    for text, l33t, reverse in candidates:
+        for i in range(n):
+            for j in range(i, min(n, i + _max_word_len)):
+                word = text[i:j + 1]
+                rank = _word_ranks.get(word)
+                if rank is None:
+                    continue
+                a, b = (n - 1 - j, n - 1 - i) if reverse else (i, j)
+                if (a, b) in seen:
+                    continue
+                token = password[a:b + 1]
+                guesses = rank * _uppercase_variations(token)
+                if l33t:
+                    guesses *= _l33t_variations(token, word)
+                if reverse:
+                    guesses *= 2
+                matches.append(Match(a, b, 'dictionary', token, guesses))
+                seen.add((a, b))
+    return matches
+
+
+def _spatial_guesses(length: int, turns: int, shifted: int) -> float:
+    guesses = 0.0
+    for i in range(2, length + 1):
+        for j in range(1, min(turns, i - 1) + 1):
+            guesses += math.comb(i - 1, j - 1) * _KEYBOARD_STARTS * _KEYBOARD_DEGREE ** j
+    if shifted:
+        guesses *= _variations(shifted, length - shifted)
+    return guesses
+
+
+def _spatial_matches(password: str) -> List[Match]:
+    matches = []
+    i = 0
+    n = len(password)
+    while i < n - 2:
+        j = i
+        turns = 0
+        direction = None
+        shifted = password[i] in _SHIFTED_KEYS or password[i].isupper()
+        while j + 1 < n and password[j + 1] in KEYBOARD_GRAPH.get(password[j], ()):
+            d = KEYBOARD_GRAPH[password[j]][password[j + 1]]
+            if d != direction:
+                turns += 1
+                direction = d
+            j += 1
+            shifted += password[j] in _SHIFTED_KEYS or password[j].isupper()
+        if j - i >= 2:
+            token = password[i:j + 1]
+            matches.append(Match(i, j, 'spatial', token, _spatial_guesses(len(token), turns, shifted)))
+        i = j + 1 if j > i else i + 1
+    return matches
+
+
+def _sequence_matches(password: str) -> List[Match]:
+    matches = []
+    n = len(password)
+    i = 0
+    while i < n - 2:
+        delta = ord(password[i + 1]) - ord(password[i])
+        j = i + 1
+        if delta in (-1, 1):
+            while j + 1 < n and ord(password[j + 1]) - ord(password[j]) == delta:
+                j += 1
+        if j - i >= 2:
+            token = password[i:j + 1]
+            first = token[0]
+            if first in 'aAzZ019':
+                base = 4
+            elif first.isdigit():
+                base = 10
+            else:
+                base = 26
+            guesses = base * len(token) * (2 if delta < 0 else 1)
+            matches.append(Match(i, j, 'sequence', token, guesses))
+            i = j
+        else:
+            i += 1
+    return matches
+
+
+def _repeat_matches(password: str) -> List[Match]:
+    matches = []
+    i = 0
+    while i < len(password):
+        greedy = REPEAT_GREEDY_RE.search(password, i)
+        if not greedy:
+            break
+        lazy = REPEAT_LAZY_RE.search(password, i)
+        m = greedy if len(greedy.group(0)) > len(lazy.group(0)) else lazy
+        base = REPEAT_LAZY_RE.fullmatch(m.group(0)).group(1)
+        count = len(m.group(0)) // len(base)
+        base_guesses = 10 ** estimate_strength(base)[0]
+        matches.append(Match(m.start(), m.end() - 1, 'repeat', m.group(0), base_guesses * count))
+        i = m.end()
+    return matches
+
+
+def _year_guesses(year: int) -> int:
+    return max(abs(year - REFERENCE_YEAR), MIN_YEAR_SPACE)
+
+
+def _valid_date(day: int, month: int, year: int) -> bool:
+    return 1 <= day <= 31 and 1 <= month <= 12 and 1000 <= year <= 2099
+
+
+def _expand_year(year: int) -> int:
+    if year > 99:
+        return year
+    return year + (1900 if year > 50 else 2000)
+
+
+def _date_matches(password: str) -> List[Match]:
+    matches = []
+    for m in DATE_RE.finditer(password):
+        a, b, c = int(m.group(1)), int(m.group(3)), int(m.group(4))
+        for day, month, year in ((a, b, c), (b, a, c), (c, b, a)):
+            year = _expand_year(year)
+            if _valid_date(day, month, year):
+                guesses = _year_guesses(year) * 365 * 4
+                matches.append(Match(m.start(), m.end() - 1, 'date', m.group(0), guesses))
+                break
+
+    for m in DIGITS_RE.finditer(password):
+        for i in range(m.start(), m.end() - 3):
+            for length in (4, 6, 8):
+                if i + length > m.end():
+                    break
+                digits = password[i:i + length]
+                if length == 4:
+                    if 1900 <= int(digits) <= 2099:
+                        matches.append(Match(i, i + 3, 'date', digits, _year_guesses(int(digits))))
+                    continue
+                # yymmdd / yyyymmdd with the year first or last.
+                ylen = length - 4
+                for year, rest in ((digits[:ylen], digits[ylen:]), (digits[-ylen:], digits[:-ylen])):
+                    year = _expand_year(int(year))
+                    x, y = int(rest[:2]), int(rest[2:])
+                    if _valid_date(x, y, year) or _valid_date(y, x, year):
+                        matches.append(Match(i, i + length - 1, 'date', digits, _year_guesses(year) * 365))
+                        break
+    return matches
+
+
+def _brute_force_guesses(token: str) -> float:
+    return 10.0 ** len(token)
+
+
+@lru_cache(maxsize=4096)
+def estimate_strength(password: str) -> Tuple[float, int, Tuple[Match, ...]]:
+    """Return (log10 guesses, 0-4 score, matched pattern sequence) for a password."""
+    n = len(password)
+    if n == 0:
+        return 0.0, 0, ()
+
+    ending = [[] for _ in range(n)]
+    for match in (_dictionary_matches(password) + _spatial_matches(password) +
+                  _sequence_matches(password) + _repeat_matches(password) +
+                  _date_matches(password)):
+        ending[match.j].append(match)
+
+    # best[k] is the cheapest log10 cost of password[:k]; a brute-force
+    # character costs one decimal digit, matched segments cost log10(guesses)
+    # with zxcvbn's minimum of 10 (single char) or 50 (longer) guesses.
+    best = [0.0] + [math.inf] * n
+    back = [None] * (n + 1)
+    for k in range(n):
+        if best[k] + 1 < best[k + 1]:
+            best[k + 1] = best[k] + 1
+            back[k + 1] = None
+        for match in ending[k]:
+            floor = 10 if match.i == match.j else 50
+            cost = best[match.i] + math.log10(max(match.guesses, floor))
+            if cost < best[k + 1]:
+                best[k + 1] = cost
+                back[k + 1] = match
+
+    sequence = []
+    k = n
+    while k > 0:
+        match = back[k]
+        if match is None:
+            start = k - 1
+            while start > 0 and back[start] is None:
+                start -= 1
+            token = password[start:k]
+            sequence.append(Match(start, k - 1, 'bruteforce', token, _brute_force_guesses(token)))
+            k = start
+        else:
+            sequence.append(match)
+            k = match.i
+    sequence.reverse()
+
+    # Guessing the order of the segments costs an extra factor of len(sequence)!.
+    log_guesses = best[n] + math.log10(math.factorial(len(sequence)))
+    score = sum(log_guesses >= math.log10(t) for t in ENTROPY_SCORE_THRESHOLDS)
+    return log_guesses, score, tuple(sequence)
+
+
+ENTROPY_FEEDBACK = {
+    'dictionary': "Avoid common words and passwords, even with l33t substitutions",
+    'spatial': "Avoid keyboard patterns (e.g., qwerty, asdf)",
+    'sequence': "Avoid sequential characters (e.g., 123, abc)",
+    'repeat': "Avoid repeated characters or words (e.g., aaa, abcabc)",
+    'date': "Avoid dates and years that are associated with you",
+}
+
+
+def _evaluate_with_entropy(password: str, blocklist) -> Tuple[str, int, List[str]]:
+    log_guesses, entropy_score, sequence = estimate_strength(password)
+    # Map the 0-4 estimator score onto the 0-9 scale used by the point tally.
+    score = (0, 2, 5, 7, 9)[entropy_score]
+    suggestions = []
+    if len(password) < 8:
+        suggestions.append("Password must be at least 8 characters long")
+    for pattern in dict.fromkeys(m.pattern for m in sequence):
+        if pattern in ENTROPY_FEEDBACK:
+            suggestions.append(ENTROPY_FEEDBACK[pattern])
+    if password.lower() in COMMON_PASSWORDS or password.lower() in blocklist:
+        score = 0
+        suggestions.append(COMMON_PASSWORD_MESSAGE)
+
+    if score <= 3:
+        strength = "Weak"
+    elif score <= 6:
+        strength = "Moderate"
+    else:
+        strength = "Strong"
+
+    suggestions.append(f"Estimated guesses to crack: 10^{log_guesses:.1f} (~{log_guesses * math.log2(10):.0f} bits)")
+    if score < 9 and len(password) < 16:
+        suggestions.append("Add another uncommon word or increase the length")
+    return strength, score, suggestions
+
+
+def evaluate_password_strength(password: str, blocklist=None,
+                               entropy: bool = False) -> Tuple[str, int, List[str]]:
+    if blocklist is None:
+        blocklist = COMMON_PASSWORDS
+    if entropy:
+        return _evaluate_with_entropy(password, blocklist)
     score = 0
     suggestions = []
     length = len(password)
@@ -46,9 +656,9 @@ def evaluate_password_strength(password: str) -> Tuple[str, int, List[str]]:
     else:
         suggestions.append("Add special characters")
 
-    if password.lower() in COMMON_PASSWORDS:
+    if password.lower() in COMMON_PASSWORDS or password.lower() in blocklist:
         score = 0
-        suggestions.append("This is a commonly used password. Choose something unique")
+        suggestions.append(COMMON_PASSWORD_MESSAGE)
 
     if re.search(r'(012|123|234|345|456|567|678|789|890|abc|bcd|cde|def)', password.lower()):
         suggestions.append("Avoid sequential characters (e.g., 123, abc)")
@@ -71,42 +681,135 @@ def evaluate_password_strength(password: str) -> Tuple[str, int, List[str]]:
     return strength, score, suggestions
 
 
-def generate_password(length: int = 16, 
-                      use_uppercase: bool = True,
-                      use_lowercase: bool = True,
-                      use_digits: bool = True,
-                      use_special: bool = True) -> str:
-    if length < 8 or length > 20:
-        length = 16
+_worker_blocklist = None
+_worker_entropy = False
+
+
+def _init_audit_worker(blocklist_path, entropy, dictionaries=()):
+    # Each worker maps the same file, so the index is loaded into memory once.
+    global _worker_blocklist, _worker_entropy
+    _worker_blocklist = open_blocklist(blocklist_path) if blocklist_path else None
+    _worker_entropy = entropy
+    for path in dictionaries:
+        if os.path.basename(path) not in RANKED_DICTIONARIES:
+            load_ranked_dictionary(os.path.basename(path), path)
+
+
+def _audit_one(password: str):
+    return evaluate_password_strength(password, _worker_blocklist, _worker_entropy)
+
+
+def iter_audit(passwords: Iterable[str], blocklist_path: str = None, entropy: bool = False,
+               workers: int = None, chunksize: int = 1024, dictionaries: Iterable[str] = (),
+               batch: int = 1 << 16) -> Iterator[Tuple[str, int, List[str]]]:
+    """Evaluate passwords across a process pool, yielding results in input order.
 
-    char_pool = ''
-    password_chars = []
+    Passwords are submitted a batch at a time, so a huge list is never held in memory.
+    """
+    passwords = iter(passwords)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_audit_worker,
+                             initargs=(blocklist_path, entropy, tuple(dictionaries))) as pool:
+        while True:
+            block = list(islice(passwords, batch))
+            if not block:
+                break
+            yield from pool.map(_audit_one, block, chunksize=chunksize)
 
-    if use_lowercase:
-        char_pool += string.ascii_lowercase
-        password_chars.append(random.choice(string.ascii_lowercase))
 
-    if use_uppercase:
-        char_pool += string.ascii_uppercase
-        password_chars.append(random.choice(string.ascii_uppercase))
+def audit_passwords(passwords: Iterable[str], blocklist_path: str = None, entropy: bool = False,
+                    workers: int = None, chunksize: int = 1024) -> List[Tuple[str, int, List[str]]]:
+    return list(iter_audit(passwords, blocklist_path, entropy, workers, chunksize))
 
-    if use_digits:
-        char_pool += string.digits
-        password_chars.append(random.choice(string.digits))
 
-    if use_special:
-        special_chars = '!@#$%^&*()_+-=[]{};\':"|,.<>?/\\`~'
-        char_pool += special_chars
-        password_chars.append(random.choice(special_chars))
+def audit_file(path: str, blocklist_path: str = None, entropy: bool = False, workers: int = None,
+               dictionaries: Iterable[str] = ()) -> dict:
+    """Audit a file of passwords (one per line) and print a summary; the passwords themselves are never shown."""
+    start = time.perf_counter()
+    counts = {'Weak': 0, 'Moderate': 0, 'Strong': 0}
+    total = blocked = score_sum = 0
+    for strength, score, suggestions in iter_audit(_read_wordlist(path), blocklist_path, entropy,
+                                                   workers, dictionaries=dictionaries):
+        total += 1
+        counts[strength] += 1
+        score_sum += score
+        blocked += COMMON_PASSWORD_MESSAGE in suggestions
+    elapsed = time.perf_counter() - start
+    print(f"Audited {total} passwords from {path} in {elapsed:.2f}s "
+          f"({total / elapsed if elapsed else 0:,.0f} passwords/s)")
+    for strength, count in counts.items():
+        print(f"  {strength:<9} {count:>10} ({count / max(total, 1):.1%})")
+    print(f"  {'Blocked':<9} {blocked:>10} ({blocked / max(total, 1):.1%}) commonly used or on the blocklist")
+    print(f"  Average score: {score_sum / max(total, 1):.2f}/9")
+    return dict(counts, total=total, blocked=blocked)
 
-    if not char_pool:
-        char_pool = string.ascii_letters + string.digits + '!@#$%^&*()_+-='
 
-    remaining_length = length - len(password_chars)
-    password_chars.extend(random.choice(char_pool) for _ in range(remaining_length))
-    random.shuffle(password_chars)
+SPECIAL_CHARS = '!@#$%^&*()_+-=[]{};\':"|,.<>?/\\`~'
+FALLBACK_POOL = string.ascii_letters + string.digits + '!@#$%^&*()_+-='
 
-    return ''.join(password_chars)
+
+@lru_cache(maxsize=None)
+def _password_policy(use_uppercase: bool, use_lowercase: bool,
+                     use_digits: bool, use_special: bool):
+    """Precompute the pool, byte translation table and required classes for a policy."""
+    classes = [chars for enabled, chars in ((use_lowercase, string.ascii_lowercase),
+                                            (use_uppercase, string.ascii_uppercase),
+                                            (use_digits, string.digits),
+                                            (use_special, SPECIAL_CHARS)) if enabled]
+    pool = ''.join(classes) or FALLBACK_POOL
+    # Bytes at or above `limit` are rejected so every pool character is
+    # equally likely (no modulo bias); the rest map to pool[b % len(pool)].
+    limit = 256 - 256 % len(pool)
+    table = bytes(ord(pool[b % len(pool)]) for b in range(256))
+    rejected = bytes(range(limit, 256))
+    return table, rejected, limit / 256, [frozenset(c) for c in classes]
+
+
+def generate_passwords(count: int, length: int = 16,
+                       use_uppercase: bool = True,
+                       use_lowercase: bool = True,
+                       use_digits: bool = True,
+                       use_special: bool = True) -> List[str]:
+    """Generate `count` passwords from the OS CSPRNG, each containing every enabled class."""
+    table, rejected, accept_rate, required = _password_policy(
+        use_uppercase, use_lowercase, use_digits, use_special)
+    if length < max(len(required), 1):
+        raise ValueError(f"length must be at least {max(len(required), 1)} for this policy")
+
+    passwords = []
+    chars = ''
+    while len(passwords) < count:
+        needed = (count - len(passwords)) * length
+        # Over-draw a little so one bulk read usually covers the rejections.
+        raw = secrets.token_bytes(int(needed / accept_rate * 1.3) + 16)
+        chars += raw.translate(table, rejected).decode('ascii')
+        usable = len(chars) - len(chars) % length
+        for i in range(0, usable, length):
+            candidate = chars[i:i + length]
+            # Resample passwords that miss a required class rather than forcing
+            # one character per class, which would skew the distribution.
+            if all(not cls.isdisjoint(candidate) for cls in required):
+                passwords.append(candidate)
+                if len(passwords) == count:
+                    break
+        chars = chars[usable:]
+    return passwords
+
+
+def generate_password(length: int = 16,
+                      use_uppercase: bool = True,
+                      use_lowercase: bool = True,
+                      use_digits: bool = True,
+                      use_special: bool = True) -> str:
+    return generate_passwords(1, length, use_uppercase, use_lowercase, use_digits, use_special)[0]
+
+
+def benchmark_generation(count: int, length: int = 16) -> float:
+    start = time.perf_counter()
+    generate_passwords(count, length)
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed else float('inf')
+    print(f"Generated {count} passwords of length {length} in {elapsed:.3f}s ({rate:,.0f} passwords/s)")
+    return rate
 
 
 def display_strength_bar(strength: str, score: int):
@@ -127,7 +830,54 @@ def display_strength_bar(strength: str, score: int):
     print(f"[{color}{bar}{reset}]")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check password strength and generate passwords.")
+    parser.add_argument('--blocklist', type=str, help='Prebuilt blocklist file (hash file or Bloom filter)')
+    parser.add_argument('--build-blocklist', type=str, metavar='WORDLIST',
+                        help='Build a blocklist from a wordlist (one password per line) and exit')
+    parser.add_argument('--format', choices=['hashfile', 'bloom'], default='hashfile',
+                        help='Format for --build-blocklist (default: hashfile)')
+    parser.add_argument('--error-rate', type=float, default=0.001,
+                        help='False-positive rate for Bloom filters (default: 0.001)')
+    parser.add_argument('--out', type=str, default='blocklist.bin', help='Output file for --build-blocklist')
+    parser.add_argument('--entropy', action='store_true',
+                        help='Score with the pattern-based entropy estimator instead of the point tally')
+    parser.add_argument('--benchmark', type=int, metavar='N',
+                        help='Time generating N passwords and report passwords per second')
+    parser.add_argument('--length', type=int, default=16, help='Password length for --benchmark (default: 16)')
+    parser.add_argument('--dictionary', type=str, action='append', default=[],
+                        help='Extra frequency-ranked wordlist for --entropy (may be repeated)')
+    parser.add_argument('--audit', type=str, metavar='FILE',
+                        help='Check every password in FILE (one per line) on a process pool and print a summary')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes for --audit (default: CPU count)')
+    args = parser.parse_args()
+    if not 0 < args.error_rate < 1:
+        parser.error(f"--error-rate must be between 0 and 1 (exclusive), not {args.error_rate}")
+    return args
+
+
 def main():
+    args = parse_args()
+    if args.build_blocklist:
+        if args.format == 'bloom':
+            count = build_bloom_filter(args.build_blocklist, args.out, args.error_rate)
+        else:
+            count = build_hash_file(args.build_blocklist, args.out)
+        print(f"Indexed {count} passwords into {args.out}")
+        return
+    if args.benchmark:
+        benchmark_generation(args.benchmark, args.length)
+        return
+    if args.audit:
+        # Workers open --blocklist themselves and share its mapped pages
+        audit_file(args.audit, args.blocklist, args.entropy, args.workers, args.dictionary)
+        return
+
+    blocklist = open_blocklist(args.blocklist) if args.blocklist else None
+    for path in args.dictionary:
+        load_ranked_dictionary(os.path.basename(path), path)
+
     while True:
         print("\nOptions:")
         print("1. Check password strength")
@@ -138,7 +888,7 @@ def main():
         
         if choice == '1':
             password = input("\nEnter password to check: ")
-            strength, score, suggestions = evaluate_password_strength(password)
+            strength, score, suggestions = evaluate_password_strength(password, blocklist, args.entropy)
             display_strength_bar(strength, score)
             print("\nFeedback:")
             for suggestion in suggestions:
@@ -146,8 +896,8 @@ def main():
         
         elif choice == '2':
             try:
-                length = int(input("Password length (8-20, default 16): ") or "16")
-                length = max(8, min(20, length))
+                length = int(input("Password length (min 8, default 16): ") or "16")
+                length = max(8, length)
             except ValueError:
                 length = 16
             
@@ -159,7 +909,7 @@ def main():
             generated = generate_password(length, use_upper, use_lower, use_digits, use_special)
             print(f"\nGenerated Password: {generated}")
             
-            strength, score, suggestions = evaluate_password_strength(generated)
+            strength, score, suggestions = evaluate_password_strength(generated, blocklist, args.entropy)
             display_strength_bar(strength, score)
         
         elif choice == '3':
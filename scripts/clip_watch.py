@@ -4,6 +4,8 @@ Monitor the system clipboard and log unique text changes to a file.
 
 Dependencies:
     pip install pyperclip
+    pip install python-xlib     # optional: clipboard change events on X11
+    wl-clipboard                # optional: clipboard change events on Wayland (wl-paste --watch)
 
 Usage Examples:
     # Log clipboard changes to default file 'cliplog.txt' every 1 second
@@ -13,49 +15,356 @@ Usage Examples:
     python clip_watch.py --out my_clip_log.txt --minlen 5
 
     # Poll clipboard every 2 seconds
-    python clip_watch.py --interval 2
+    python clip_watch.py --interval 2 --backend poll
+
+    # Log the same text again if it comes back after an hour; keep the log under 10 MiB plus 5 old logs
+    python clip_watch.py --dedup-window 3600 --max-bytes 10485760 --backups 5
 
 CLI Arguments:
-    --out      : Output log file name (default: cliplog.txt)
-    --minlen   : Ignore entries shorter than this length (default: 1)
-    --interval : Polling interval in seconds (default: 1)
+    --out          : Output log file name (default: cliplog.txt)
+    --minlen       : Ignore entries shorter than this length (default: 1)
+    --backend      : auto, wayland, x11 or poll (default: auto)
+    --interval     : Polling interval in seconds (default: 1)
+    --max-interval : Longest polling interval reached while the clipboard is idle (default: 10)
+    --dedup-size   : Remember at most this many logged entries for deduplication (default: 10000)
+    --dedup-window : Forget logged entries not seen for this many seconds (default: 0, never)
+    --flush        : Seconds between writes of buffered entries to the log (default: 5)
+    --max-bytes    : Rotate the log before it grows past this size (default: 0, no limit)
+    --backups      : Rotated logs to keep as <out>.1 ... <out>.N (default: 3)
+
+Where the platform can report clipboard changes, nothing is polled: on
+Wayland `wl-paste --watch` hands over the text of each new clipboard, and on
+X11 the XFixes extension signals each change of the CLIPBOARD owner, after
+which the text is read once. Otherwise the clipboard is polled every
+--interval seconds while it keeps changing, backing off towards
+--max-interval while it is idle.
+
+Entries already logged are remembered by a 16-byte BLAKE2 digest rather than
+their text, in an index bounded by --dedup-size (least recently seen entries
+are forgotten first) and optionally by --dedup-window. Log lines are buffered
+and written every --flush seconds, and on exit.
 """
 
 import argparse
+import hashlib
+import os
+import queue
+import select
+import shutil
+import signal
+import subprocess
 import time
+from collections import OrderedDict, deque
 from datetime import datetime
 import pyperclip
 import sys
 
+try:
+    from Xlib import display as xdisplay
+    from Xlib.ext import xfixes
+except ImportError:
+    xdisplay = None
+
+class SeenIndex:
+    """Bounded record of logged clipboard entries, keyed by content digest, oldest-seen evicted first."""
+
+    def __init__(self, max_entries=10000, window=0):
+        self.max_entries = max_entries
+        self.window = window
+        self.entries = OrderedDict()    # digest -> time last seen, least recently seen first
+
+    def add(self, text, now):
+        """Record text as seen at now; return True if it was not already in the index."""
+        digest = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        if self.window:
+            while self.entries:
+                oldest, seen = next(iter(self.entries.items()))
+                if now - seen < self.window:
+                    break
+                del self.entries[oldest]
+        new = digest not in self.entries
+        self.entries[digest] = now
+        self.entries.move_to_end(digest)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return new
+
+class ClipLog:
+    """Append-only log that buffers lines, writes them in batches and rotates by size."""
+
+    def __init__(self, path, flush_interval=5, max_bytes=0, backups=3, max_pending=1 << 20):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.max_pending = max_pending
+        self.file = open(path, 'ab')
+        self.size = self.file.tell()
+        self.pending = []
+        self.pending_bytes = 0
+        self.last_flush = time.monotonic()
+
+    def write(self, line):
+        data = line.encode('utf-8', 'surrogatepass')
+        if self.max_bytes and self.size + self.pending_bytes + len(data) > self.max_bytes and \
+                self.size + self.pending_bytes:
+            self.rotate()
+        self.pending.append(data)
+        self.pending_bytes += len(data)
+        if self.pending_bytes >= self.max_pending:
+            self.flush()
+
+    def maybe_flush(self, now):
+        if now - self.last_flush >= self.flush_interval:
+            self.flush()
+            self.last_flush = now
+
+    def flush(self):
+        if self.pending:
+            self.file.write(b"".join(self.pending))
+            self.size += self.pending_bytes
+            self.pending = []
+            self.pending_bytes = 0
+        self.file.flush()
+
+    def rotate(self):
+        """Move the log to <path>.1, shifting older logs up and dropping the last; with no backups, truncate."""
+        self.flush()
+        self.file.close()
+        if self.backups:
+            for i in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{i}"):
+                    os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self.file = open(self.path, 'wb')
+        self.size = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+class PollingWatcher:
+    """Polls paste(), backing off while the clipboard is idle and snapping back to interval on a change."""
+
+    name = "polling"
+
+    def __init__(self, paste=None, interval=1, max_interval=10, backoff=1.5):
+        self.paste = paste or pyperclip.paste
+        self.interval = interval
+        self.max_interval = max(max_interval, interval)
+        self.backoff = backoff
+        self.current = interval
+        self.next_poll = time.monotonic()
+        self.last = None
+
+    def wait(self, timeout):
+        """Return the clipboard text once it changes, or None if it has not within timeout seconds."""
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            if self.next_poll > deadline:
+                time.sleep(max(deadline - now, 0))
+                return None
+            if self.next_poll > now:
+                time.sleep(self.next_poll - now)
+            clip = self.paste()
+            changed = clip != self.last
+            self.last = clip
+            self.current = self.interval if changed else min(self.current * self.backoff, self.max_interval)
+            self.next_poll = time.monotonic() + self.current
+            if changed:
+                return clip
+
+    def close(self):
+        pass
+
+class WaylandWatcher:
+    """Receives the text of every new clipboard from `wl-paste --watch`, NUL-separated."""
+
+    name = "wl-paste --watch"
+
+    def __init__(self):
+        if not shutil.which('wl-paste'):
+            raise RuntimeError("wl-paste not found (install wl-clipboard)")
+        # wl-paste runs the command with the new clipboard on stdin each time it changes, starting with the current one
+        self.proc = subprocess.Popen(
+            ['wl-paste', '--no-newline', '--type', 'text', '--watch', 'sh', '-c', 'cat; printf "\\0"'],
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+        )
+        self.buffer = bytearray()
+        self.ready = deque()
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while not self.ready:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([self.proc.stdout], [], [], remaining)[0]:
+                return None
+            data = os.read(self.proc.stdout.fileno(), 1 << 16)
+            if not data:
+                raise EOFError("wl-paste exited")
+            start = len(self.buffer)
+            self.buffer += data
+            end = self.buffer.find(b"\0", start)
+            while end >= 0:
+                self.ready.append(self.buffer[:end].decode('utf-8', 'replace'))
+                del self.buffer[:end + 1]
+                end = self.buffer.find(b"\0")
+        return self.ready.popleft()
+
+    def close(self):
+        self.proc.terminate()
+        self.proc.wait()
+
+class XFixesWatcher:
+    """Waits for XFixes selection-owner events and reads the clipboard with paste() only when it changes."""
+
+    name = "X11 XFixes events"
+
+    def __init__(self, paste=None, selection='CLIPBOARD'):
+        if xdisplay is None:
+            raise RuntimeError("python-xlib is not installed")
+        self.display = xdisplay.Display()
+        if not self.display.has_extension('XFIXES'):
+            self.display.close()
+            raise RuntimeError("the X server has no XFIXES extension")
+        self.display.xfixes_query_version()
+        self.display.xfixes_select_selection_input(
+            self.display.screen().root, self.display.get_atom(selection), xfixes.XFixesSetSelectionOwnerNotifyMask)
+        self.display.flush()
+        self.paste = paste or pyperclip.paste
+        self.changed = True     # report the current contents first
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while not self.changed:
+            if not self.display.pending_events():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([self.display], [], [], remaining)[0]:
+                    return None
+            while self.display.pending_events():
+                event = self.display.next_event()
+                if (event.type, getattr(event, 'sub_code', None)) == self.display.extension_event.SetSelectionOwnerNotify:
+                    self.changed = True
+        self.changed = False
+        return self.paste()
+
+    def close(self):
+        self.display.close()
+
+class FakeClipboard:
+    """In-memory clipboard for tests: copy() from any thread, then use it as a watcher or as paste() for polling."""
+
+    name = "fake clipboard"
+
+    def __init__(self, text=""):
+        self.text = text
+        self.changes = queue.Queue()
+        self.changes.put(text)
+
+    def copy(self, text):
+        self.text = text
+        self.changes.put(text)
+
+    def paste(self):
+        return self.text
+
+    def wait(self, timeout):
+        try:
+            text = self.changes.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if text is None:
+            raise EOFError("clipboard closed")
+        return text
+
+    def close(self):
+        """End watch() once the changes copied so far have been handled."""
+        self.changes.put(None)
+
+def open_watcher(backend='auto', interval=1, max_interval=10):
+    """The first clipboard watcher that works here among those backend allows, falling back to polling."""
+    if backend in ('auto', 'wayland') and (backend == 'wayland' or os.environ.get('WAYLAND_DISPLAY')):
+        try:
+            return WaylandWatcher()
+        except (RuntimeError, OSError) as e:
+            if backend == 'wayland':
+                raise
+            print(f"Clipboard events unavailable on Wayland ({e}); trying X11.", file=sys.stderr)
+    if backend in ('auto', 'x11') and (backend == 'x11' or os.environ.get('DISPLAY')):
+        try:
+            return XFixesWatcher()
+        except Exception as e:
+            # python-xlib raises its own error types for a display it cannot open or talk to
+            if backend == 'x11':
+                raise
+            print(f"Clipboard events unavailable on X11 ({e}); polling instead.", file=sys.stderr)
+    return PollingWatcher(interval=interval, max_interval=max_interval)
+
+def watch(watcher, log, seen, minlen=1, echo=True):
+    """Log every new, not yet seen clipboard text from watcher until it raises EOFError."""
+    last_clip = None
+    while True:
+        timeout = max(log.last_flush + log.flush_interval - time.monotonic(), 0)
+        try:
+            clip = watcher.wait(timeout)
+        except EOFError:
+            return
+        now = time.monotonic()
+        if (clip is not None and
+            clip != last_clip and
+            isinstance(clip, str) and
+            len(clip) >= minlen and
+            seen.add(clip, now)):
+            timestamp = datetime.now().isoformat()
+            log.write(f"{timestamp}: {clip}\n")
+            if echo:
+                print(f"{timestamp}: {clip}")
+        if clip is not None:
+            last_clip = clip
+        log.maybe_flush(now)
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Monitor clipboard and log unique text changes.")
     parser.add_argument('--out', type=str, default='cliplog.txt', help='Output log file')
     parser.add_argument('--minlen', type=int, default=1, help='Ignore entries shorter than this length')
+    parser.add_argument('--backend', choices=['auto', 'wayland', 'x11', 'poll'], default='auto',
+                        help='How to learn about clipboard changes (auto: events where available, else polling)')
     parser.add_argument('--interval', type=float, default=1, help='Polling interval in seconds')
-    return parser.parse_args()
+    parser.add_argument('--max-interval', type=float, default=10,
+                        help='Longest polling interval reached while the clipboard is idle')
+    parser.add_argument('--dedup-size', type=int, default=10000,
+                        help='Remember at most this many logged entries for deduplication')
+    parser.add_argument('--dedup-window', type=float, default=0,
+                        help='Forget logged entries not seen for this many seconds (0: never)')
+    parser.add_argument('--flush', type=float, default=5, help='Seconds between writes of buffered entries')
+    parser.add_argument('--max-bytes', type=int, default=0, help='Rotate the log before it grows past this size')
+    parser.add_argument('--backups', type=int, default=3, help='Rotated logs to keep')
+    args = parser.parse_args()
+    if args.flush <= 0:
+        parser.error(f"--flush must be a positive number of seconds, not {args.flush}")
+    return args
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
 
 def main():
     args = parse_args()
-    last_clip = None
-    logged = set()
+    # Stopped by kill: still write out the buffered entries
+    signal.signal(signal.SIGTERM, _interrupt)
+    seen = SeenIndex(args.dedup_size, args.dedup_window)
+    watcher = open_watcher(args.backend, args.interval, args.max_interval)
+    print(f"Watching the clipboard with {watcher.name}.", file=sys.stderr)
+    log = ClipLog(args.out, args.flush, args.max_bytes, args.backups)
     try:
-        with open(args.out, 'a') as logfile:
-            while True:
-                clip = pyperclip.paste()
-                if (clip != last_clip and
-                    isinstance(clip, str) and
-                    len(clip) >= args.minlen and
-                    clip not in logged):
-                    timestamp = datetime.now().isoformat()
-                    logfile.write(f"{timestamp}: {clip}\n")
-                    logfile.flush()
-                    logged.add(clip)
-                    print(f"{timestamp}: {clip}")
-                last_clip = clip
-                time.sleep(args.interval)
+        watch(watcher, log, seen, args.minlen)
+        print("\nClipboard watcher exited.")
     except KeyboardInterrupt:
         print("\nInterrupted by user. Exiting.")
         sys.exit(0)
+    finally:
+        watcher.close()
+        log.close()
 
 if __name__ == "__main__":
     main()
@@ -9,83 +9,1005 @@ Usage Examples:
     # Monitor /home/user/docs every 30 seconds and log to custom file
     python dir_snapshot.py --path /home/user/docs --interval 30 --out my_snapshots.json
 
+    # Keep the last snapshot in a custom state file so restarts skip rehashing
+    python dir_snapshot.py --path /my/folder --state /var/tmp/folder_state.json
+
+    # Watch with inotify (Linux) and log changes once they settle for 2 seconds
+    python dir_snapshot.py --path /my/folder --watch --debounce 2
+
+    # Record history in a compressed binary store, then query it
+    python dir_snapshot.py --path /my/folder --store folder.dsr --compression lzma
+    python dir_snapshot.py --store folder.dsr --at 2024-05-01T12:00:00
+    python dir_snapshot.py --store folder.dsr --history /my/folder/report.txt
+
 CLI Arguments:
-    --path     : Directory to monitor (required)
+    --path     : Directory to monitor (required unless querying --store)
     --interval : Interval in seconds between snapshots (default: 60)
-    --out      : Output log file (default: snapshot_log.json)
+    --out      : Output log file (default: snapshot_log.json unless --store is given)
+    --state    : File holding the last snapshot (default: snapshot_state.json)
+    --algorithm: Hash algorithm: md5, sha1, sha256, blake2b, blake2s, or
+                 xxh64/xxh3_64/xxh3_128 when xxhash is installed (default: md5)
+    --mmap-threshold : Hash files of at least this many MiB through mmap (default: off)
+    --workers  : Number of hashing threads (default: CPU count + 4, max 32)
+    --watch    : Use inotify events instead of rescanning every --interval (Linux only)
+    --debounce : In --watch mode, seconds to collect events before logging (default: 1)
+    --save-interval : In --watch mode, seconds between rewrites of --state (default: 300)
+    --store    : Append changes to a binary snapshot store (index kept in <store>.idx)
+    --compression : Store compression: none, zlib, bz2, lzma or zstd (default: zlib)
+    --checkpoint-every : Deltas between full checkpoints in the store (default: 100)
+    --at       : Print the stored tree as of an ISO timestamp and exit
+    --history  : Print the stored history of one path and exit
+
+Files whose size, mtime and inode are unchanged since the previous snapshot
+keep their previous hash and are not read again. In --watch mode only the
+paths named by inotify events are rehashed; a full rescan is done when the
+kernel event queue overflows, and polling is used if inotify is unavailable.
 """
 
 import argparse
+import bisect
+import bz2
+import ctypes
+import ctypes.util
+import errno
 import os
+import select
+import signal
+import struct
+import sys
 import time
 import hashlib
 import json
+import lzma
+import mmap
+import zlib
+from collections import deque
+from stat import S_ISREG
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime
 
-def file_hash(path):
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+HASH_CHUNK_SIZE = 1 << 20
+HASHLIB_ALGORITHMS = ["md5", "sha1", "sha256", "blake2b", "blake2s"]
+XXHASH_ALGORITHMS = ["xxh64", "xxh3_64", "xxh3_128"]
+
+def new_hasher(algorithm):
+    if algorithm in XXHASH_ALGORITHMS:
+        if xxhash is None:
+            raise ValueError(f"{algorithm} requires the xxhash package (pip install xxhash)")
+        return getattr(xxhash, algorithm)()
+    return hashlib.new(algorithm)
+
+def file_hash(path, algorithm="md5", mmap_threshold=None):
+    # Stream the file through the hasher so memory use does not depend on file size
     try:
         with open(path, "rb") as f:
-            return hashlib.md5(f.read()).hexdigest()
+            hasher = new_hasher(algorithm)
+            size = os.fstat(f.fileno()).st_size
+            if mmap_threshold is not None and size and size >= mmap_threshold:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mm, "madvise"):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    view = memoryview(mm)
+                    try:
+                        for offset in range(0, size, HASH_CHUNK_SIZE):
+                            hasher.update(view[offset:offset + HASH_CHUNK_SIZE])
+                    finally:
+                        view.release()
+            elif hasattr(hashlib, "file_digest") and algorithm in HASHLIB_ALGORITHMS:
+                hasher = hashlib.file_digest(f, lambda: hasher)
+            else:
+                buf = bytearray(HASH_CHUNK_SIZE)
+                view = memoryview(buf)
+                while True:
+                    n = f.readinto(buf)
+                    if not n:
+                        break
+                    hasher.update(view[:n])
+            return hasher.hexdigest()
     except Exception:
         return None
 
-def snapshot_dir(root):
+def scan_files(root):
+    # Iterative os.scandir walk; DirEntry caches the file type and stat result
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry.path, entry.stat()
+                except OSError:
+                    continue
+
+class FileEntry:
+    """Size, mtime, inode and content hash of one file.
+
+    Uses __slots__ rather than a dict per file, which keeps snapshots of
+    millions of files to roughly a third of the memory.
+    """
+
+    __slots__ = ("size", "mtime_ns", "inode", "hash")
+
+    def __init__(self, size, mtime_ns, inode, hash=None):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.inode = inode
+        self.hash = hash
+
+    @classmethod
+    def from_stat(cls, stat):
+        return cls(stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    @classmethod
+    def from_json(cls, value):
+        # State files written before entries were stored as lists held dicts
+        if isinstance(value, dict):
+            mtime_ns = value.get("mtime_ns", int(value.get("mtime", 0) * 1e9))
+            return cls(value["size"], mtime_ns, value.get("inode", 0), value.get("hash"))
+        return cls(*value)
+
+    def to_json(self):
+        return [self.size, self.mtime_ns, self.inode, self.hash]
+
+    @property
+    def mtime(self):
+        return self.mtime_ns / 1e9
+
+    def __eq__(self, other):
+        if not isinstance(other, FileEntry):
+            return NotImplemented
+        return (self.size, self.mtime_ns, self.inode, self.hash) == \
+            (other.size, other.mtime_ns, other.inode, other.hash)
+
+    def __repr__(self):
+        return f"FileEntry(size={self.size}, mtime_ns={self.mtime_ns}, inode={self.inode}, hash={self.hash!r})"
+
+def reusable_hash(old, entry):
+    # A hash can be reused while the file's size, mtime and inode are unchanged
+    if (old is not None and old.hash is not None and
+            (old.size, old.mtime_ns, old.inode) == (entry.size, entry.mtime_ns, entry.inode)):
+        return old.hash
+    return None
+
+def snapshot_dir(root, previous=None, algorithm="md5", mmap_threshold=None, workers=1):
+    previous = previous or {}
     snapshot = {}
-    for dirpath, _, filenames in os.walk(root):
-        for fname in filenames:
-            fpath = os.path.join(dirpath, fname)
-            try:
-                stat = os.stat(fpath)
-                snapshot[fpath] = {
-                    "size": stat.st_size,
-                    "mtime": stat.st_mtime,
-                    "hash": file_hash(fpath)
-                }
-            except Exception:
+    pending = {}
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def collect(done):
+        for future in done:
+            snapshot[pending.pop(future)].hash = future.result()
+
+    try:
+        for fpath, stat in scan_files(root):
+            entry = FileEntry.from_stat(stat)
+            # Only hash files whose metadata changed since the last snapshot;
+            # unchanged files keep the previous entry object
+            old = previous.get(fpath)
+            if reusable_hash(old, entry) is not None:
+                snapshot[fpath] = old
+                continue
+            snapshot[fpath] = entry
+            if pool is None:
+                entry.hash = file_hash(fpath, algorithm, mmap_threshold)
                 continue
+            # Keep the queue bounded so a huge tree doesn't pile up futures
+            if len(pending) >= workers * 4:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending[pool.submit(file_hash, fpath, algorithm, mmap_threshold)] = fpath
+        collect(as_completed(list(pending)))
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
     return snapshot
 
+def load_state(path, algorithm="md5"):
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Hashes from a different algorithm can't be reused or compared
+    if state.get("algorithm") != algorithm:
+        return {}
+    return {path: FileEntry.from_json(value) for path, value in state.get("files", {}).items()}
+
+def save_state(path, snapshot, algorithm="md5"):
+    # Write to a temporary file first so a crash never leaves a truncated state
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"algorithm": algorithm,
+                   "files": {path: entry.to_json() for path, entry in snapshot.items()}}, f)
+    os.replace(tmp_path, path)
+
 def compare_snapshots(old, new):
     changes = {"new": [], "deleted": [], "modified": [], "renamed": []}
-    old_files = set(old.keys())
-    new_files = set(new.keys())
 
-    changes["new"] = list(new_files - old_files)
-    changes["deleted"] = list(old_files - new_files)
+    # Key-view differences run in C and only materialise the changed paths
+    changes["new"] = list(new.keys() - old.keys())
+    changes["deleted"] = list(old.keys() - new.keys())
 
-    # Detect modified files
-    for f in old_files & new_files:
-        if old[f]["hash"] != new[f]["hash"] or old[f]["size"] != new[f]["size"]:
+    # Unchanged files share their FileEntry with the previous snapshot
+    for f, entry in new.items():
+        old_entry = old.get(f)
+        if (old_entry is not None and old_entry is not entry and
+                (old_entry.hash != entry.hash or old_entry.size != entry.size)):
             changes["modified"].append(f)
 
-    # Simple rename detection: files with same hash but different path
-    old_hash_map = {v["hash"]: k for k, v in old.items()}
+    # Rename detection: pair each new file with a deleted file of the same
+    # content, preferring one with the same name when several share a hash.
+    # Both indexes skip files already paired, so each pairing is O(1) even when
+    # thousands of deleted files share a hash (empty files)
+    deleted_by_hash = {}
+    deleted_by_name = {}
+    for f in changes["deleted"]:
+        h = old[f].hash
+        if h is not None:
+            deleted_by_hash.setdefault(h, []).append(f)
+            deleted_by_name.setdefault((h, os.path.basename(f)), deque()).append(f)
+    paired = set()
+    renamed_new = set()
     for f in changes["new"]:
-        h = new[f]["hash"]
-        if h in old_hash_map and old_hash_map[h] not in changes["deleted"]:
-            changes["renamed"].append((old_hash_map[h], f))
+        h = new[f].hash
+        candidates = deleted_by_hash.get(h)
+        while candidates and candidates[-1] in paired:
+            candidates.pop()
+        if not candidates:
+            continue
+        source = None
+        same_name = deleted_by_name.get((h, os.path.basename(f)))
+        while same_name:
+            source = same_name.popleft()
+            if source not in paired:
+                break
+            source = None
+        if source is None:
+            source = candidates.pop()
+        paired.add(source)
+        changes["renamed"].append((source, f))
+        renamed_new.add(f)
+
+    if renamed_new:
+        changes["new"] = [f for f in changes["new"] if f not in renamed_new]
+        changes["deleted"] = [f for f in changes["deleted"] if f not in paired]
 
     return changes
 
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+class Inotify:
+    """Minimal ctypes wrapper around the Linux inotify API with recursive watches."""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.paths = {}  # watch descriptor -> directory
+        self.wds = {}    # directory -> watch descriptor
+
+    def add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        self.paths[wd] = path
+        self.wds[path] = wd
+
+    def add_tree(self, root):
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                self.add_watch(directory)
+                with os.scandir(directory) as it:
+                    stack.extend(e.path for e in it if e.is_dir(follow_symlinks=False))
+            except OSError as e:
+                # Running out of watches is fatal; vanished directories are not
+                if e.errno == errno.ENOSPC:
+                    raise
+                continue
+
+    def remove_tree(self, root):
+        prefix = root + os.sep
+        for path in [p for p in self.wds if p == root or p.startswith(prefix)]:
+            wd = self.wds.pop(path)
+            self.paths.pop(wd, None)
+            self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self, timeout):
+        """Wait up to `timeout` seconds and return a list of (path, mask, cookie).
+
+        A path of None means the kernel queue overflowed and events were lost.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 1 << 16)
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, mask, cookie))
+                continue
+            directory = self.paths.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.paths[wd]
+                self.wds.pop(directory, None)
+                continue
+            path = os.path.join(directory, os.fsdecode(name)) if name else directory
+            events.append((path, mask, cookie))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+def log_changes(out, changes):
+    log_entry = {
+        "timestamp": datetime.now().isoformat(),
+        "changes": changes
+    }
+    with open(out, "a") as logfile:
+        logfile.write(json.dumps(log_entry) + "\n")
+    print(f"{log_entry['timestamp']}: Changes detected: {changes}")
+
+class TreeIndex:
+    """File paths grouped by directory, so a subtree is listed without scanning the whole snapshot."""
+
+    def __init__(self, paths=()):
+        self.files = {}   # directory -> paths of the files directly in it
+        self.dirs = {}    # directory -> subdirectories with files somewhere below them
+        for path in paths:
+            self.add(path)
+
+    def add(self, path):
+        directory = os.path.dirname(path)
+        files = self.files.get(directory)
+        if files is None:
+            files = self.files[directory] = set()
+            # Link the directory into its ancestors, stopping at the first one already linked
+            child = directory
+            while True:
+                parent = os.path.dirname(child)
+                subdirs = self.dirs.setdefault(parent, set())
+                if parent == child or child in subdirs:
+                    break
+                subdirs.add(child)
+                child = parent
+        files.add(path)
+
+    def discard(self, path):
+        files = self.files.get(os.path.dirname(path))
+        if files is not None:
+            files.discard(path)
+
+    def _walk(self, directory):
+        stack = [directory]
+        while stack:
+            directory = stack.pop()
+            yield directory
+            stack.extend(self.dirs.get(directory, ()))
+
+    def subtree(self, directory):
+        return [path for d in self._walk(directory) for path in self.files.get(d, ())]
+
+    def drop(self, directory):
+        """Forget a directory that was deleted or moved away, with everything below it."""
+        for d in list(self._walk(directory)):
+            self.files.pop(d, None)
+            self.dirs.pop(d, None)
+        self.dirs.get(os.path.dirname(directory), set()).discard(directory)
+
+def watch_dir(inotify, root, snapshot, snapshot_tree, hash_file, record, state, algorithm, debounce,
+              save_every=300):
+    """Keep `snapshot` up to date from inotify events, recording changes every `debounce` seconds.
+
+    The state file is rewritten at most every `save_every` seconds and on exit,
+    since it holds the whole snapshot rather than just the changes.
+    """
+    pending = {}     # path -> new entry, or None once deleted
+    unsaved = False
+    dirty = set()    # files written to but not yet closed
+    moved = {}       # inotify cookie -> (old path, entries under it)
+
+    index = TreeIndex(snapshot)
+
+    def current(path):
+        return pending[path] if path in pending else snapshot.get(path)
+
+    def stage(path, entry):
+        pending[path] = entry
+        if entry is None:
+            index.discard(path)
+        else:
+            index.add(path)
+
+    def flush():
+        nonlocal unsaved
+        for path in list(dirty):
+            update_file(path)
+        dirty.clear()
+        moved.clear()
+        if not pending:
+            return
+        # Only touched paths take part in the diff, so a flush costs O(changes)
+        old = {p: snapshot[p] for p in pending if p in snapshot}
+        new = {p: e for p, e in pending.items() if e is not None}
+        for path, entry in pending.items():
+            if entry is None:
+                snapshot.pop(path, None)
+            else:
+                snapshot[path] = entry
+        pending.clear()
+        changes = compare_snapshots(old, new)
+        if any(changes.values()):
+            record(changes, snapshot)
+        unsaved = True
+
+    def update_file(path, previous=None):
+        dirty.discard(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        if not S_ISREG(stat.st_mode):
+            return
+        entry = FileEntry.from_stat(stat)
+        entry.hash = reusable_hash(previous or current(path), entry) or hash_file(path)
+        if entry != current(path):
+            stage(path, entry)
+
+    def remove(paths):
+        paths = [p for p in paths if current(p) is not None]
+        # Log short-lived files that appeared since the last flush before they go
+        if any(p not in snapshot for p in paths):
+            flush()
+        for path in paths:
+            stage(path, None)
+            dirty.discard(path)
+
+    def subtree(directory):
+        return {p: current(p) for p in index.subtree(directory)}
+
+    def add_tree(directory, previous):
+        inotify.add_tree(directory)
+        for path, entry in snapshot_tree(directory, previous).items():
+            if entry != current(path):
+                stage(path, entry)
+
+    def rescan():
+        inotify.add_tree(root)
+        previous = {p: current(p) for p in set(snapshot) | set(pending)}
+        full = snapshot_tree(root, {p: e for p, e in previous.items() if e is not None})
+        remove([p for p in previous if p not in full])
+        for path, entry in full.items():
+            if entry != current(path):
+                stage(path, entry)
+
+    def watch_events(deadline):
+        for path, mask, cookie in inotify.read_events(max(0, deadline - time.monotonic())):
+            if path is None:
+                print("inotify queue overflowed; rescanning the whole tree")
+                rescan()
+            elif mask & IN_ISDIR:
+                if mask & (IN_DELETE | IN_MOVED_FROM):
+                    entries = subtree(path)
+                    if mask & IN_MOVED_FROM:
+                        moved[cookie] = (path, entries)
+                    remove(entries)
+                    index.drop(path)
+                    inotify.remove_tree(path)
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    # Reuse hashes for a directory moved within the tree
+                    old_dir, entries = moved.pop(cookie, (None, {}))
+                    previous = {path + p[len(old_dir):]: e for p, e in entries.items() if e} if old_dir else {}
+                    add_tree(path, previous)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                if mask & IN_MOVED_FROM:
+                    moved[cookie] = (path, {path: current(path)})
+                remove([path])
+            elif mask & IN_MOVED_TO:
+                old_path, entries = moved.pop(cookie, (None, {}))
+                update_file(path, entries.get(old_path))
+            elif mask & (IN_CLOSE_WRITE | IN_ATTRIB):
+                update_file(path)
+            elif mask & (IN_CREATE | IN_MODIFY):
+                dirty.add(path)
+
+    next_flush = time.monotonic() + debounce
+    next_save = time.monotonic() + save_every
+    try:
+        while True:
+            watch_events(next_flush)
+            if time.monotonic() >= next_flush:
+                flush()
+                next_flush = time.monotonic() + debounce
+            if unsaved and time.monotonic() >= next_save:
+                save_state(state, snapshot, algorithm)
+                unsaved = False
+                next_save = time.monotonic() + save_every
+    finally:
+        flush()
+        if unsaved:
+            save_state(state, snapshot, algorithm)
+
+# Binary snapshot store: an append-only log of delta and checkpoint records.
+# Each record is a header, a small Bloom filter of the paths it touches and a
+# compressed payload of path-sorted, front-coded entries. A sidecar index of
+# (timestamp, offset, kind) lets queries seek straight to the records they need.
+STORE_MAGIC = b"DSR2"
+STORE_HEADER = struct.Struct("<4sBBBdIQ")  # magic, kind, codec, hash algorithm, timestamp, bloom bytes, payload bytes
+STORE_ALGORITHMS = HASHLIB_ALGORITHMS + XXHASH_ALGORITHMS
+INDEX_RECORD = struct.Struct("<dQB")       # timestamp, record offset, kind
+ENTRY_HEADER = struct.Struct("<HHB")       # shared prefix length, suffix length, op
+ENTRY_FIELDS = struct.Struct("<QqQB")      # size, mtime_ns, inode, digest length
+CHECKPOINT, DELTA = 0, 1
+OP_UPSERT, OP_DELETE = 0, 1
+CODECS = ["none", "zlib", "bz2", "lzma", "zstd"]
+BLOOM_HASHES = 3
+
+def _compressor(codec):
+    if codec == "zlib":
+        return zlib.compressobj(6)
+    if codec == "bz2":
+        return bz2.BZ2Compressor()
+    if codec == "lzma":
+        return lzma.LZMACompressor()
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package (pip install zstandard)")
+        return zstandard.ZstdCompressor().compressobj()
+    return None
+
+def _decompressor(codec):
+    if codec == "zlib":
+        return zlib.decompressobj()
+    if codec == "bz2":
+        return bz2.BZ2Decompressor()
+    if codec == "lzma":
+        return lzma.LZMADecompressor()
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("reading zstd records requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompressobj()
+    return None
+
+def _shared_prefix(a, b):
+    # Binary search with slice comparisons keeps the work in C
+    lo, hi = 0, min(len(a), len(b), 0xFFFF)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def _bloom_positions(raw_path, num_bits):
+    h = int.from_bytes(hashlib.blake2b(raw_path, digest_size=8).digest(), "little")
+    h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+    return [(h1 + i * h2) % num_bits for i in range(BLOOM_HASHES)]
+
+def _build_bloom(raw_paths):
+    size = 32
+    while size < 2 * len(raw_paths) and size < 65536:
+        size *= 2
+    bloom = bytearray(size)
+    for raw in raw_paths:
+        for bit in _bloom_positions(raw, size * 8):
+            bloom[bit >> 3] |= 1 << (bit & 7)
+    return bytes(bloom)
+
+def _bloom_contains(bloom, raw_path):
+    return all(bloom[bit >> 3] & (1 << (bit & 7)) for bit in _bloom_positions(raw_path, len(bloom) * 8))
+
+class _PayloadReader:
+    """Read exact byte counts from a compressed payload without inflating it all at once."""
+
+    def __init__(self, f, codec, length):
+        self._f = f
+        self._left = length
+        self._decompressor = _decompressor(codec)
+        self._buf = b""
+        self._pos = 0
+
+    def _fill(self):
+        chunk = self._f.read(min(self._left, 1 << 16))
+        if not chunk:
+            raise EOFError("snapshot store record is truncated")
+        self._left -= len(chunk)
+        data = chunk
+        if self._decompressor is not None:
+            data = self._decompressor.decompress(chunk)
+            if self._left == 0 and hasattr(self._decompressor, "flush"):
+                data += self._decompressor.flush()
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+
+    def at_end(self):
+        while self._pos >= len(self._buf):
+            if self._left <= 0:
+                return True
+            self._fill()
+        return False
+
+    def read(self, n):
+        while len(self._buf) - self._pos < n:
+            if self._left <= 0:
+                raise EOFError("snapshot store record is truncated")
+            self._fill()
+        data = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return data
+
+class SnapshotStore:
+    """Append-only binary history of a directory with checkpoints, deltas and a time index."""
+
+    def __init__(self, path, compression="zlib", checkpoint_every=100, read_only=False, algorithm="md5"):
+        _compressor(compression)  # fail early if the codec is unavailable
+        self.path = path
+        self.index_path = path + ".idx"
+        self.compression = compression
+        self.checkpoint_every = checkpoint_every
+        self.read_only = read_only
+        self.algorithm = algorithm
+        self.deltas_since_checkpoint = 0
+        self.index = self._load_index()
+        if self.index and not read_only:
+            # Hashes from another algorithm never match, so every file would look modified
+            recorded = self._record_algorithm(self.index[-1][1])
+            if recorded != algorithm:
+                raise ValueError(f"{path} holds {recorded} hashes; use --algorithm {recorded} or a new store")
+
+    def _load_index(self):
+        if not os.path.exists(self.path):
+            return []
+        if not os.path.exists(self.index_path):
+            return self._rebuild_index()
+        with open(self.index_path, "rb") as f:
+            data = f.read()
+        usable = len(data) - len(data) % INDEX_RECORD.size
+        index = [INDEX_RECORD.unpack_from(data, i) for i in range(0, usable, INDEX_RECORD.size)]
+        if self.read_only:
+            # A writer may be appending right now: records past the last indexed one are
+            # simply not visible yet, and recovering from a crash is left to the writer
+            return index
+        # A record only counts once it is indexed; drop anything written after
+        # the last indexed record (e.g. a crash mid-append)
+        end = self._record_end(index[-1][1]) if index else 0
+        if os.path.getsize(self.path) != end:
+            with open(self.path, "r+b") as f:
+                f.truncate(end)
+        if usable != len(data):
+            with open(self.index_path, "r+b") as f:
+                f.truncate(usable)
+        return index
+
+    def _rebuild_index(self):
+        index = []
+        size = os.path.getsize(self.path)
+        offset = 0
+        with open(self.path, "rb") as f:
+            while offset + STORE_HEADER.size <= size:
+                f.seek(offset)
+                magic, kind, _, _, timestamp, bloom_len, payload_len = STORE_HEADER.unpack(f.read(STORE_HEADER.size))
+                end = offset + STORE_HEADER.size + bloom_len + payload_len
+                if magic != STORE_MAGIC or end > size:
+                    break
+                index.append((timestamp, offset, kind))
+                offset = end
+        if self.read_only:
+            return index
+        with open(self.path, "r+b") as f:
+            f.truncate(offset)
+        with open(self.index_path, "wb") as f:
+            for record in index:
+                f.write(INDEX_RECORD.pack(*record))
+        return index
+
+    def _read_header(self, f, offset):
+        f.seek(offset)
+        magic, kind, codec, _, timestamp, bloom_len, payload_len = STORE_HEADER.unpack(f.read(STORE_HEADER.size))
+        if magic != STORE_MAGIC:
+            raise ValueError(f"{self.path}: no snapshot record at offset {offset}")
+        return kind, CODECS[codec], timestamp, bloom_len, payload_len
+
+    def _record_algorithm(self, offset):
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            magic, _, _, algorithm = STORE_HEADER.unpack(f.read(STORE_HEADER.size))[:4]
+        if magic != STORE_MAGIC:
+            raise ValueError(f"{self.path}: no snapshot record at offset {offset}")
+        return STORE_ALGORITHMS[algorithm]
+
+    def _record_end(self, offset):
+        with open(self.path, "rb") as f:
+            _, _, _, bloom_len, payload_len = self._read_header(f, offset)
+        return offset + STORE_HEADER.size + bloom_len + payload_len
+
+    def _append(self, kind, timestamp, entries):
+        if self.read_only:
+            raise ValueError(f"{self.path}: store is open read-only")
+        # entries: (path, op, FileEntry or None), written in encoded-path order
+        encoded = sorted(((os.fsencode(path), op, entry) for path, op, entry in entries), key=lambda e: e[0])
+        bloom = _build_bloom([raw for raw, _, _ in encoded]) if kind == DELTA else b""
+        compressor = _compressor(self.compression)
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            f.write(STORE_HEADER.pack(STORE_MAGIC, kind, CODECS.index(self.compression),
+                                      STORE_ALGORITHMS.index(self.algorithm), timestamp, len(bloom), 0))
+            f.write(bloom)
+            written = 0
+            buf = bytearray()
+            prev = b""
+            for raw, op, entry in encoded:
+                shared = _shared_prefix(prev, raw)
+                buf += ENTRY_HEADER.pack(shared, len(raw) - shared, op)
+                buf += raw[shared:]
+                if op == OP_UPSERT:
+                    digest = bytes.fromhex(entry.hash) if entry.hash else b""
+                    buf += ENTRY_FIELDS.pack(entry.size, entry.mtime_ns, entry.inode, len(digest))
+                    buf += digest
+                prev = raw
+                if len(buf) >= 1 << 16:
+                    data = compressor.compress(bytes(buf)) if compressor else bytes(buf)
+                    f.write(data)
+                    written += len(data)
+                    buf.clear()
+            data = compressor.compress(bytes(buf)) + compressor.flush() if compressor else bytes(buf)
+            f.write(data)
+            written += len(data)
+        # Patch in the payload length, then index the record to commit it
+        with open(self.path, "r+b") as f:
+            f.seek(offset + STORE_HEADER.size - 8)
+            f.write(struct.pack("<Q", written))
+        with open(self.index_path, "ab") as f:
+            f.write(INDEX_RECORD.pack(timestamp, offset, kind))
+        self.index.append((timestamp, offset, kind))
+
+    def checkpoint(self, timestamp, snapshot):
+        self._append(CHECKPOINT, timestamp, ((p, OP_UPSERT, e) for p, e in snapshot.items()))
+        self.deltas_since_checkpoint = 0
+
+    def record(self, timestamp, changes, snapshot):
+        """Append the changes from compare_snapshots, checkpointing every `checkpoint_every` deltas."""
+        upserts = changes["new"] + changes["modified"] + [new for _, new in changes["renamed"]]
+        deletes = changes["deleted"] + [old for old, _ in changes["renamed"]]
+        if not upserts and not deletes:
+            return
+        self._append(DELTA, timestamp, [(p, OP_UPSERT, snapshot[p]) for p in upserts] +
+                     [(p, OP_DELETE, None) for p in deletes])
+        self.deltas_since_checkpoint += 1
+        if self.deltas_since_checkpoint >= self.checkpoint_every:
+            self.checkpoint(timestamp, snapshot)
+
+    def _iter_record(self, f, offset):
+        _, codec, _, bloom_len, payload_len = self._read_header(f, offset)
+        f.seek(bloom_len, os.SEEK_CUR)
+        reader = _PayloadReader(f, codec, payload_len)
+        prev = b""
+        while not reader.at_end():
+            shared, suffix_len, op = ENTRY_HEADER.unpack(reader.read(ENTRY_HEADER.size))
+            raw = prev[:shared] + reader.read(suffix_len)
+            entry = None
+            if op == OP_UPSERT:
+                size, mtime_ns, inode, digest_len = ENTRY_FIELDS.unpack(reader.read(ENTRY_FIELDS.size))
+                digest = reader.read(digest_len)
+                entry = FileEntry(size, mtime_ns, inode, digest.hex() if digest_len else None)
+            prev = raw
+            yield raw, op, entry
+
+    def tree_at(self, timestamp):
+        """Return the snapshot as it was at `timestamp` (seconds since the epoch)."""
+        last = bisect.bisect_right([t for t, _, _ in self.index], timestamp) - 1
+        if last < 0:
+            return {}
+        start = last
+        while start >= 0 and self.index[start][2] != CHECKPOINT:
+            start -= 1
+        if start < 0:
+            raise ValueError(f"{self.path}: no checkpoint at or before {timestamp}")
+        tree = {}
+        with open(self.path, "rb") as f:
+            for i in range(start, last + 1):
+                _, offset, kind = self.index[i]
+                if i > start and kind == CHECKPOINT:
+                    continue
+                for raw, op, entry in self._iter_record(f, offset):
+                    if op == OP_UPSERT:
+                        tree[os.fsdecode(raw)] = entry
+                    else:
+                        tree.pop(os.fsdecode(raw), None)
+        return tree
+
+    def history(self, path):
+        """Return [(timestamp, status, FileEntry or None)] for one path.
+
+        Status is "present" (in the first checkpoint), "created", "changed" or "deleted".
+        """
+        target = os.fsencode(path)
+        events = []
+        seen_checkpoint = False
+        with open(self.path, "rb") as f:
+            for timestamp, offset, kind in self.index:
+                if kind == CHECKPOINT:
+                    # Deltas cover everything after the first checkpoint
+                    if seen_checkpoint:
+                        continue
+                    seen_checkpoint = True
+                else:
+                    _, _, _, bloom_len, _ = self._read_header(f, offset)
+                    if not _bloom_contains(f.read(bloom_len), target):
+                        continue
+                # Entries are sorted, so stop reading once past the target
+                for raw, op, entry in self._iter_record(f, offset):
+                    if raw > target:
+                        break
+                    if raw == target:
+                        if kind == CHECKPOINT:
+                            status = "present"
+                        elif op == OP_DELETE:
+                            status = "deleted"
+                        elif events and events[-1][1] != "deleted":
+                            status = "changed"
+                        else:
+                            status = "created"
+                        events.append((timestamp, status, entry))
+                        break
+        return events
+
+def query_store(store, at=None, history=None):
+    if at:
+        tree = store.tree_at(datetime.fromisoformat(at).timestamp())
+        for path in sorted(tree):
+            entry = tree[path]
+            print(f"{path}\t{entry.size}\t{datetime.fromtimestamp(entry.mtime).isoformat()}\t{entry.hash}")
+        print(f"{len(tree)} files as of {at}")
+    if history:
+        events = store.history(history)
+        for timestamp, status, entry in events:
+            details = f" size={entry.size} hash={entry.hash}" if entry else ""
+            print(f"{datetime.fromtimestamp(timestamp).isoformat()}: {status}{details}")
+        if not events:
+            print(f"No history for {history}")
+
+def _terminate(signum, frame):
+    sys.exit(0)
+
 def main():
     parser = argparse.ArgumentParser(description="Take periodic snapshots of a directory and log changes.")
-    parser.add_argument('--path', type=str, required=True, help='Directory to monitor')
+    parser.add_argument('--path', type=str, help='Directory to monitor (required unless querying)')
     parser.add_argument('--interval', type=int, default=60, help='Interval in seconds between snapshots')
-    parser.add_argument('--out', type=str, default='snapshot_log.json', help='Output log file')
+    parser.add_argument('--out', type=str, help='Output log file (default: snapshot_log.json unless --store is given)')
+    parser.add_argument('--state', type=str, default='snapshot_state.json', help='File holding the last snapshot')
+    parser.add_argument('--algorithm', type=str, default='md5', choices=HASHLIB_ALGORITHMS + XXHASH_ALGORITHMS,
+                        help='Hash algorithm (xxh* require the xxhash package)')
+    parser.add_argument('--mmap-threshold', type=int, default=None,
+                        help='Hash files of at least this many MiB through mmap')
+    parser.add_argument('--workers', type=int, default=min(32, (os.cpu_count() or 1) + 4),
+                        help='Number of hashing threads')
+    parser.add_argument('--watch', action='store_true', help='Use inotify events instead of periodic rescans')
+    parser.add_argument('--debounce', type=float, default=1.0,
+                        help='In --watch mode, seconds to collect events before logging')
+    parser.add_argument('--save-interval', type=float, default=300,
+                        help='In --watch mode, seconds between rewrites of the --state file')
+    parser.add_argument('--store', type=str, help='Binary snapshot store for history queries')
+    parser.add_argument('--compression', type=str, default='zlib', choices=CODECS,
+                        help='Compression for --store records (zstd requires the zstandard package)')
+    parser.add_argument('--checkpoint-every', type=int, default=100,
+                        help='Write a full checkpoint to --store after this many deltas')
+    parser.add_argument('--at', type=str, help='Print the tree in --store as of this ISO timestamp and exit')
+    parser.add_argument('--history', type=str, help='Print the history of this path from --store and exit')
     args = parser.parse_args()
 
-    prev_snapshot = snapshot_dir(args.path)
+    if args.at or args.history:
+        if not args.store:
+            parser.error("--at and --history need --store")
+        query_store(SnapshotStore(args.store, read_only=True), args.at, args.history)
+        return
+    if not args.path:
+        parser.error("--path is required")
+    if args.out is None and not args.store:
+        args.out = 'snapshot_log.json'
+
+    try:
+        new_hasher(args.algorithm)
+    except ValueError as e:
+        parser.error(str(e))
+    mmap_threshold = args.mmap_threshold * 1024 * 1024 if args.mmap_threshold is not None else None
+    try:
+        store = SnapshotStore(args.store, args.compression, args.checkpoint_every,
+                              algorithm=args.algorithm) if args.store else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    def record(changes, snapshot):
+        if args.out:
+            log_changes(args.out, changes)
+        if store is not None:
+            store.record(time.time(), changes, snapshot)
+
+    def take_snapshot(previous, root=args.path):
+        return snapshot_dir(root, previous, args.algorithm, mmap_threshold, args.workers)
+
+    inotify = None
+    if args.watch:
+        # Set up watches before the first scan so no change slips in between
+        try:
+            inotify = Inotify()
+            inotify.add_tree(args.path)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}); falling back to polling every {args.interval}s")
+            if inotify is not None:
+                inotify.close()
+                inotify = None
+
+    prev_snapshot = take_snapshot(load_state(args.state, args.algorithm))
+    save_state(args.state, prev_snapshot, args.algorithm)
+    if store is not None:
+        if store.index:
+            # Log what changed while nothing was watching as a delta: history() only
+            # reads the first checkpoint and relies on deltas for everything after it
+            changes = compare_snapshots(store.tree_at(float("inf")), prev_snapshot)
+            store.record(time.time(), changes, prev_snapshot)
+        else:
+            store.checkpoint(time.time(), prev_snapshot)
+
+    if inotify is not None:
+        # Stopped by kill or timeout: still log pending changes and save the state
+        signal.signal(signal.SIGTERM, _terminate)
+        watch_dir(inotify, args.path, prev_snapshot, lambda root, previous: take_snapshot(previous, root),
+                  lambda path: file_hash(path, args.algorithm, mmap_threshold),
+                  record, args.state, args.algorithm, args.debounce, args.save_interval)
+        return
+
     while True:
         time.sleep(args.interval)
-        curr_snapshot = snapshot_dir(args.path)
+        curr_snapshot = take_snapshot(prev_snapshot)
+        save_state(args.state, curr_snapshot, args.algorithm)
         changes = compare_snapshots(prev_snapshot, curr_snapshot)
-        log_entry = {
-            "timestamp": datetime.now().isoformat(),
-            "changes": changes
-        }
-        with open(args.out, "a") as logfile:
-            logfile.write(json.dumps(log_entry) + "\n")
-        print(f"{log_entry['timestamp']}: Changes detected: {changes}")
+        record(changes, curr_snapshot)
         prev_snapshot = curr_snapshot
 
 if __name__ == "__main__":
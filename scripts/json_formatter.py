@@ -8,39 +8,656 @@ Usage:
 
     # Validate a JSON file without writing output
     python scripts/json_formatter.py -i raw.json
+
+    # Stream a file larger than memory, minified, in constant memory
+    python scripts/json_formatter.py -i huge.json -o huge.min.json --stream --minify
+
+    # Validate every JSON/NDJSON file under a directory on 8 worker processes
+    python scripts/json_formatter.py -i exports/ "incoming/**/*.jsonl" --workers 8 --report report.jsonl
+
+    # Reformat a batch into another directory, treating every input as NDJSON
+    python scripts/json_formatter.py -i "logs/*.log" --ndjson --output-dir clean/
+
+    # Measure batch throughput on generated data
+    python scripts/json_formatter.py --benchmark
+
+    # Print a content hash of the canonical form (sha256sum-style output)
+    python scripts/json_formatter.py -i a.json b.json --hash
+
+    # Compare parse/serialize speed of the available JSON backends
+    python scripts/json_formatter.py --benchmark backends
+
+--stream never holds the whole document: it tokenizes the input in chunks,
+keeps only the nesting stack and writes output as it goes. Keys keep their
+original order and numbers/strings are copied verbatim. Errors report the
+byte offset, line and column of the first problem.
+
+Batch mode (several inputs, globs, directories, --ndjson, --output-dir,
+--workers or --report) processes files across a process pool and prints one
+result line per file as it finishes. Files ending in .ndjson or .jsonl are
+validated record by record. Under --output-dir, files from a directory or glob
+keep their path below it (or below the glob's last literal directory), and
+inputs that would land on the same output are rejected.
+
+Parsing and serializing go through orjson when it is installed (--backend
+auto), falling back to the stdlib json module for input orjson cannot
+represent exactly (NaN/Infinity, integers beyond 64 bits). orjson only
+indents by two spaces, so use --indent 2 to get its speed for pretty output.
+Pretty and minified output escape non-ASCII characters, as the json module
+does by default; documents that need escaping go through the json module.
+--canonical writes sorted keys, no whitespace and raw UTF-8, rejecting
+NaN/Infinity, and is byte-identical whichever backend produced it, so it can
+be hashed (--hash) to compare documents by content.
 """
 
 import argparse
+import codecs
+import glob
+import hashlib
 import json
+import os
+import random
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import sys
 
-def format_json(input_file: Path, output_file: Path = None):
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHUNK_SIZE = 1 << 20
+NDJSON_SUFFIXES = {".ndjson", ".jsonl"}
+BATCH_SUFFIXES = {".json"} | NDJSON_SUFFIXES
+MAX_REPORTED_ERRORS = 5
+
+TOKEN_RE = re.compile(rb'''
+    [ \t\n\r]*
+    (?:
+        (?P<punct>[{}\[\]:,])
+      | (?P<string>"(?:[^"\\\x00-\x1f]|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4}))*")
+      | (?P<number>-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?)
+      | (?P<literal>true|false|null)
+    )''', re.VERBOSE)
+# Anything that could still become a valid token once more input arrives
+PARTIAL_RE = re.compile(rb'''
+    [ \t\n\r]*
+    (?:
+        "(?:[^"\\\x00-\x1f]|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{0,4})?)*
+      | -?[0-9.eE+-]*
+      | t(?:r(?:u)?)? | f(?:a(?:l(?:s)?)?)? | n(?:u(?:l)?)?
+    )''', re.VERBOSE)
+WHITESPACE_RE = re.compile(rb'[ \t\n\r]*')
+NUMBER_TAIL_RE = re.compile(rb'[0-9.eE+-]*')
+# orjson parses integers beyond 64 bits as floats, which then print as >= 1e19
+BIG_FLOAT_RE = re.compile(rb'e\+?(?:1[89]|[2-9][0-9]|[0-9]{3})')
+# orjson spells exponents differently from Python's repr (1e16 vs 1e+16, 0.00001 vs 1e-05)
+EXPONENT_RE = re.compile(rb'e[-+]?[0-9]')
+SMALL_FLOAT_RE = re.compile(rb'0\.0000')
+
+
+class JsonStreamError(ValueError):
+    def __init__(self, msg, offset):
+        super().__init__(msg)
+        self.msg = msg
+        self.offset = offset
+
+
+class JsonTokenizer:
+    """Yield (kind, token, byte offset) from a binary file, reading it in chunks."""
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = b""
+        self.pos = 0
+        self.base = 0         # byte offset of buf[0] in the file
+        self.lines = 0        # newlines before buf[0]
+        self.line_start = 0   # offset where the line containing buf[0] starts
+        self.eof = False
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+
+    def _read_more(self):
+        chunk = self.f.read(self.chunk_size)
+        # Drop what has been consumed, remembering its newlines for error positions
+        consumed = self.buf[:self.pos]
+        self.lines += consumed.count(b"\n")
+        nl = consumed.rfind(b"\n")
+        if nl >= 0:
+            self.line_start = self.base + nl + 1
+        self.base += self.pos
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+        try:
+            self._utf8.decode(chunk, final=not chunk)
+        except UnicodeDecodeError as e:
+            raise JsonStreamError("Invalid UTF-8", self.base + len(self.buf) + max(e.start, 0))
+        if not chunk:
+            self.eof = True
+        self.buf += chunk
+
+    def location(self, offset):
+        """Return (line, column) for a byte offset inside the current buffer."""
+        before = self.buf[:offset - self.base]
+        line = self.lines + before.count(b"\n") + 1
+        nl = before.rfind(b"\n")
+        line_start = self.base + nl + 1 if nl >= 0 else self.line_start
+        return line, offset - line_start + 1
+
+    def __iter__(self):
+        """Yield one regex match per token; its byte offset is base + start()."""
+        while True:
+            # Fast path: tokens before the last structural character in the
+            # buffer are complete, so scan them without boundary checks
+            limit = max(self.buf.rfind(c, self.pos) for c in (b",", b"]", b"}", b":")) + 1
+            if limit > self.pos:
+                match = TOKEN_RE.scanner(self.buf, self.pos, limit).match
+                m = match()
+                while m is not None:
+                    self.pos = m.end()
+                    yield m
+                    m = match()
+
+            m = TOKEN_RE.match(self.buf, self.pos)
+            # A token may continue in the next chunk: an unmatched tail, or a
+            # number that only number characters follow up to the buffer end
+            if not self.eof and (PARTIAL_RE.fullmatch(self.buf, self.pos) if m is None else
+                                 m.end() == len(self.buf) or
+                                 (m.lastgroup == "number" and NUMBER_TAIL_RE.fullmatch(self.buf, m.end()))):
+                self._read_more()
+                continue
+            if m is None:
+                start = WHITESPACE_RE.match(self.buf, self.pos).end()
+                if start == len(self.buf) and self.eof:
+                    return
+                if start == len(self.buf):
+                    msg = "Unexpected end of input"
+                elif self.buf[start:start + 1] == b'"':
+                    msg = "Invalid or unterminated string"
+                else:
+                    msg = "Unexpected character"
+                raise JsonStreamError(msg, self.base + start)
+            self.pos = m.end()
+            yield m
+
+
+def stream_format(tokenizer, out, indent=4, minify=False):
+    """Validate the tokenizer's stream and write it to `out` pretty-printed or minified."""
+    parts = []
+    write = parts.append
+    stack = []
+    state = "value"
+    member_start = False
+    colon = b":" if minify else b": "
+    pads = [b"\n"]
+
+    def newline(depth):
+        while len(pads) <= depth:
+            pads.append(pads[-1] + b" " * indent)
+        write(pads[depth])
+
+    def error(msg, m):
+        return JsonStreamError(msg, tokenizer.base + m.start(m.lastgroup))
+
+    for m in tokenizer:
+        kind = m.lastgroup
+        token = m.group(kind)
+        if state == "done":
+            raise error("Extra data", m)
+
+        if token == b"}" or token == b"]":
+            if not stack or token != (b"}" if stack[-1] == b"{" else b"]") or \
+                    state not in ("comma_or_close", "key_or_close", "value_or_close"):
+                raise error(f"Unexpected '{token.decode()}'", m)
+            stack.pop()
+            if state == "comma_or_close" and not minify:
+                newline(len(stack))
+            member_start = False
+            write(token)
+            state = "comma_or_close" if stack else "done"
+            continue
+
+        if member_start:
+            if not minify:
+                newline(len(stack))
+            member_start = False
+
+        if state == "comma_or_close":
+            if token != b",":
+                raise error("Expecting ',' delimiter", m)
+            write(b",")
+            member_start = True
+            state = "key" if stack[-1] == b"{" else "value"
+        elif state == "colon":
+            if token != b":":
+                raise error("Expecting ':' delimiter", m)
+            write(colon)
+            state = "value"
+        elif state == "key" or state == "key_or_close":
+            if kind != "string":
+                raise error("Expecting property name enclosed in double quotes", m)
+            write(token)
+            state = "colon"
+        elif kind == "punct":
+            if token != b"{" and token != b"[":
+                raise error("Expecting value", m)
+            write(token)
+            stack.append(token)
+            member_start = True
+            state = "key_or_close" if token == b"{" else "value_or_close"
+        else:
+            write(token)
+            state = "comma_or_close" if stack else "done"
+
+        if len(parts) >= 4096:
+            out.write(b"".join(parts))
+            parts.clear()
+
+    if state != "done":
+        out.write(b"".join(parts))
+        raise JsonStreamError("Unexpected end of input", None)
+    if not minify:
+        write(b"\n")
+    out.write(b"".join(parts))
+
+
+def stream_format_json(input_file: Path, output_file: Path = None, indent: int = 4, minify: bool = False):
     if not input_file.exists():
         print(f"Error: {input_file} does not exist.")
         return False
 
+    # Write to a temporary file so invalid input never leaves a partial output
+    tmp_file = output_file.with_name(output_file.name + ".tmp") if output_file else None
+    out = open(tmp_file, "wb") if tmp_file else sys.stdout.buffer
+
+    with open(input_file, "rb") as f:
+        tokenizer = JsonTokenizer(f)
+        try:
+            stream_format(tokenizer, out, indent, minify)
+        except JsonStreamError as e:
+            if tmp_file:
+                out.close()
+                os.remove(tmp_file)
+            else:
+                out.write(b"\n")
+                out.flush()
+            offset = e.offset if e.offset is not None else tokenizer.base + len(tokenizer.buf)
+            line, column = tokenizer.location(offset)
+            print(f"JSON is invalid: {e.msg}: line {line} column {column} (byte {offset})")
+            return False
+
+    if tmp_file:
+        out.close()
+        os.replace(tmp_file, output_file)
+        print(f"Formatted JSON saved to {output_file}")
+    else:
+        out.flush()
+    return True
+
+
+def _matches_after(regex, text, digit):
+    """True if regex matches where the preceding byte is (or is not) a digit."""
+    return any(text[m.start() - 1:m.start()].isdigit() == digit for m in regex.finditer(text))
+
+
+class StdlibBackend:
+    """Parse and serialize with the json module."""
+    name = "json"
+
+    def loads(self, raw):
+        return json.loads(raw)
+
+    def dumps(self, data, style="pretty", indent=4):
+        if style == "pretty":
+            text = json.dumps(data, indent=indent, sort_keys=True)
+        elif style == "canonical":
+            text = json.dumps(data, separators=(",", ":"), sort_keys=True, ensure_ascii=False, allow_nan=False)
+        else:
+            text = json.dumps(data, separators=(",", ":"), sort_keys=True)
+        return text.encode("utf-8")
+
+    def reformat(self, raw, styles=(), indent=4):
+        """Parse raw JSON and serialize it once per style; raises ValueError if invalid."""
+        data = self.loads(raw)
+        return [self.dumps(data, style, indent) for style in styles]
+
+
+class OrjsonBackend(StdlibBackend):
+    """Parse and serialize with orjson, redoing the work with the json module where it would differ."""
+    name = "orjson"
+
+    def loads(self, raw):
+        return orjson.loads(raw)
+
+    def dumps(self, data, style="pretty", indent=4):
+        if style == "pretty" and indent != 2:
+            return super().dumps(data, style, indent)
+        option = orjson.OPT_SORT_KEYS | (orjson.OPT_INDENT_2 if style == "pretty" else 0)
+        out = orjson.dumps(data, option=option)
+        if style != "canonical" and not out.isascii():
+            # orjson cannot escape non-ASCII characters; only canonical output keeps them as UTF-8
+            return super().dumps(data, style, indent)
+        return out
+
+    def reformat(self, raw, styles=(), indent=4):
+        try:
+            outputs = super().reformat(raw, styles, indent)
+        except orjson.JSONDecodeError:
+            # NaN/Infinity, or invalid input that should get the json module's error message
+            return BACKENDS["json"].reformat(raw, styles, indent)
+        for style, out in zip(styles, outputs):
+            if style == "canonical":
+                lossy = _matches_after(EXPONENT_RE, out, True) or _matches_after(SMALL_FLOAT_RE, out, False)
+            else:
+                lossy = _matches_after(BIG_FLOAT_RE, out, True)
+            if lossy:
+                return BACKENDS["json"].reformat(raw, styles, indent)
+        return outputs
+
+
+BACKENDS = {"json": StdlibBackend()}
+if orjson is not None:
+    BACKENDS["orjson"] = OrjsonBackend()
+
+
+def get_backend(name="auto"):
+    if name == "auto":
+        return BACKENDS.get("orjson", BACKENDS["json"])
+    if name not in BACKENDS:
+        raise ValueError(f"JSON backend {name!r} is not installed")
+    return BACKENDS[name]
+
+
+def format_json(input_file: Path, output_file: Path = None, minify: bool = False, canonical: bool = False,
+                indent: int = 4, backend: str = "auto", digest: bool = False):
+    if not input_file.exists():
+        print(f"Error: {input_file} does not exist.")
+        return False
+
+    style = "canonical" if canonical else "minify" if minify else "pretty"
     try:
-        data = json.loads(input_file.read_text(encoding="utf-8"))
-    except json.JSONDecodeError as e:
+        outputs = get_backend(backend).reformat(input_file.read_bytes(), [style, "canonical"][:1 + digest], indent)
+    except ValueError as e:
         print(f"JSON is invalid: {e}")
         return False
+    text = outputs[0]
 
-    if output_file:
-        output_file.write_text(json.dumps(data, indent=4, sort_keys=True), encoding="utf-8")
+    if digest:
+        print(f"{hashlib.sha256(outputs[-1]).hexdigest()}  {input_file}")
+        if output_file:
+            output_file.write_bytes(text)
+    elif output_file:
+        output_file.write_bytes(text)
         print(f"Formatted JSON saved to {output_file}")
     else:
-        print(json.dumps(data, indent=4, sort_keys=True))
+        sys.stdout.buffer.write(text + b"\n")
+        sys.stdout.flush()
 
     return True
 
+def expand_inputs(patterns):
+    """Return (path, relative output path) for every file named by the patterns."""
+    files = []
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            for child in sorted(path.rglob("*")):
+                if child.is_file() and child.suffix.lower() in BATCH_SUFFIXES:
+                    files.append((child, child.relative_to(path)))
+        elif glob.has_magic(pattern):
+            # Keep the part of each match below the pattern's last literal directory,
+            # so "in/**/x.json" maps in/a/x.json and in/b/x.json to different outputs
+            parts = path.parts
+            literal = next(i for i, part in enumerate(parts) if glob.has_magic(part))
+            root = Path(*parts[:literal]) if literal else Path()
+            for match in sorted(glob.glob(pattern, recursive=True)):
+                if os.path.isfile(match):
+                    files.append((Path(match), Path(match).relative_to(root)))
+        else:
+            files.append((path, Path(path.name)))
+    return files
+
+def _process_ndjson(path, out, style, backend, hasher):
+    # Records are always written one per line, so pretty output becomes minified
+    style = "canonical" if style == "canonical" else "minify"
+    styles = ([style] if out else []) + (["canonical"] if hasher else [])
+    records = 0
+    errors = []
+    invalid = 0
+    with open(path, "rb") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            records += 1
+            try:
+                outputs = backend.reformat(line, styles)
+            except ValueError as e:
+                invalid += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append(f"line {lineno}: {e}")
+                continue
+            if out:
+                out.write(outputs[0] + b"\n")
+            if hasher:
+                hasher.update(outputs[-1] + b"\n")
+    return records, invalid, errors
+
+def _process_document(path, out, style, stream, backend, hasher, indent):
+    if stream:
+        with open(path, "rb") as f, open(os.devnull, "wb") as sink:
+            tokenizer = JsonTokenizer(f)
+            try:
+                stream_format(tokenizer, out or sink, indent, minify=style == "minify")
+            except JsonStreamError as e:
+                offset = e.offset if e.offset is not None else tokenizer.base + len(tokenizer.buf)
+                line, column = tokenizer.location(offset)
+                return 1, 1, [f"{e.msg}: line {line} column {column} (byte {offset})"]
+        return 1, 0, []
+    styles = ([style] if out else []) + (["canonical"] if hasher else [])
+    try:
+        outputs = backend.reformat(path.read_bytes(), styles, indent)
+    except ValueError as e:
+        return 1, 1, [str(e)]
+    if out:
+        out.write(outputs[0])
+    if hasher:
+        hasher.update(outputs[-1])
+    return 1, 0, []
+
+def process_file(path, output_file=None, ndjson=False, style="pretty", stream=False, backend="auto",
+                 digest=False, indent=4):
+    """Validate (and optionally reformat or hash) one file; returns a report dict."""
+    start = time.perf_counter()
+    result = {"file": str(path), "valid": False, "records": 0, "invalid": 0, "bytes": 0, "errors": []}
+    try:
+        result["bytes"] = path.stat().st_size
+        is_ndjson = ndjson or path.suffix.lower() in NDJSON_SUFFIXES
+        json_backend = get_backend(backend)
+        hasher = hashlib.sha256() if digest else None
+        out = None
+        if output_file:
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            out = open(output_file, "wb")
+        try:
+            if is_ndjson:
+                counts = _process_ndjson(path, out, style, json_backend, hasher)
+            else:
+                counts = _process_document(path, out, style, stream, json_backend, hasher, indent)
+        finally:
+            if out:
+                out.close()
+        result["records"], result["invalid"], result["errors"] = counts
+        result["valid"] = result["invalid"] == 0
+        if hasher and result["valid"]:
+            result["sha256"] = hasher.hexdigest()
+        if output_file and not is_ndjson and not result["valid"]:
+            output_file.unlink()
+    except (OSError, UnicodeDecodeError) as e:
+        result["errors"] = [str(e)]
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def _process_job(job):
+    return process_file(*job)
+
+def batch_format(patterns, output_dir=None, ndjson=False, style="pretty", stream=False,
+                 workers=None, report=None, quiet=False, backend="auto", digest=False, indent=4):
+    """Process many files across a process pool, streaming one result per file."""
+    files = expand_inputs(patterns)
+    if not files:
+        print("No input files found.")
+        return False
+
+    if output_dir:
+        # Two workers writing the same output would silently keep only one of the files
+        targets = {}
+        for path, rel in files:
+            if rel in targets:
+                print(f"Error: {targets[rel]} and {path} would both be written to {output_dir / rel}")
+                return False
+            targets[rel] = path
+    jobs = [(path, output_dir / rel if output_dir else None, ndjson, style, stream, backend, digest, indent)
+            for path, rel in files]
+    totals = {"files": 0, "invalid_files": 0, "records": 0, "invalid_records": 0, "bytes": 0}
+    start = time.perf_counter()
+    report_file = open(report, "w") if report else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_process_job, job) for job in jobs]
+            for future in as_completed(futures):
+                result = future.result()
+                totals["files"] += 1
+                totals["invalid_files"] += not result["valid"]
+                totals["records"] += result["records"]
+                totals["invalid_records"] += result["invalid"]
+                totals["bytes"] += result["bytes"]
+                if report_file:
+                    report_file.write(json.dumps(result) + "\n")
+                if quiet:
+                    continue
+                if result.get("sha256"):
+                    print(f"{result['sha256']}  {result['file']}")
+                elif result["valid"]:
+                    print(f"OK       {result['file']} ({result['records']} records)")
+                else:
+                    print(f"INVALID  {result['file']}: {'; '.join(result['errors'])}")
+    finally:
+        if report_file:
+            report_file.close()
+
+    elapsed = time.perf_counter() - start
+    totals["seconds"] = elapsed
+    print(f"{totals['files']} files, {totals['invalid_files']} invalid, "
+          f"{totals['records']} records ({totals['invalid_records']} invalid), "
+          f"{totals['bytes'] / 1e6:.1f} MB in {elapsed:.2f}s "
+          f"({totals['files'] / elapsed:.0f} files/s, {totals['bytes'] / 1e6 / elapsed:.1f} MB/s)")
+    return totals["invalid_files"] == 0
+
+def run_benchmark(num_files=200, records_per_file=2000, workers=None):
+    """Generate a mixed JSON/NDJSON corpus and time batch validation with 1 and N workers."""
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(num_files):
+            rows = [{"id": n, "name": f"user{rng.randrange(10**6)}", "score": rng.random(),
+                     "tags": [rng.choice("abcdef") for _ in range(3)], "active": n % 2 == 0}
+                    for n in range(records_per_file)]
+            if i % 2:
+                Path(tmp, f"part{i}.ndjson").write_text("".join(json.dumps(r) + "\n" for r in rows))
+            else:
+                Path(tmp, f"part{i}.json").write_text(json.dumps({"rows": rows}))
+        for n in (1, workers or os.cpu_count() or 1):
+            print(f"workers={n}: ", end="", flush=True)
+            batch_format([tmp], workers=n, quiet=True)
+
+def _benchmark_documents(rng):
+    """Representative large inputs: record arrays, deep nesting, text-heavy and number-heavy."""
+    words = ["alpha", "beta", "gamma", "délta", "εψιλον", "ζήτα", "日本語", "emoji 🎉", "quote\"d", "tab\tbed"]
+    yield "records", [{"id": n, "name": f"user{rng.randrange(10**6)}", "email": f"u{n}@example.com",
+                       "score": rng.random(), "active": n % 3 == 0, "tags": rng.sample(words, 3),
+                       "address": {"city": rng.choice(words), "zip": f"{rng.randrange(10**5):05d}"}}
+                      for n in range(100000)]
+    def tree(depth):
+        if depth == 0:
+            return rng.randrange(1000)
+        return {f"k{i}": tree(depth - 1) for i in range(4)} | {"list": [depth, None, True]}
+    yield "nested", tree(9)
+    yield "text", [" ".join(rng.choices(words, k=rng.randrange(5, 60))) for _ in range(60000)]
+    yield "numbers", [[rng.uniform(-1e6, 1e6) for _ in range(50)] for _ in range(10000)]
+
+def _best_time(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run_backend_benchmark(indent=4):
+    """Time parsing alone and parse+serialize in each style with every available backend."""
+    rng = random.Random(0)
+    print(f"backends: {', '.join(BACKENDS)}")
+    for label, document in _benchmark_documents(rng):
+        raw = json.dumps(document).encode("utf-8")
+        mb = len(raw) / 1e6
+        print(f"{label}: {mb:.1f} MB")
+        for name, backend in BACKENDS.items():
+            timings = [("parse", _best_time(lambda: backend.reformat(raw)))]
+            for style in ("pretty", "minify", "canonical"):
+                timings.append((style, _best_time(lambda: backend.reformat(raw, [style], indent))))
+            print(f"  {name:<8}" + "".join(f"  {what} {mb / seconds:7.1f} MB/s" for what, seconds in timings))
+
 def main():
     parser = argparse.ArgumentParser(description="Validate and pretty-print JSON files")
-    parser.add_argument('--input', '-i', type=Path, required=True, help="Input JSON file path")
-    parser.add_argument('--output', '-o', type=Path, help="Output file path (optional)")
+    parser.add_argument('--input', '-i', nargs='+',
+                        help="Input JSON file path(s), directories or glob patterns")
+    parser.add_argument('--output', '-o', type=Path, help="Output file path (optional, single file only)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Format in constant memory (keeps key order and original number/string text)")
+    parser.add_argument('--minify', action='store_true', help="Write compact output without whitespace")
+    parser.add_argument('--canonical', action='store_true',
+                        help="Write canonical JSON (sorted keys, no whitespace, UTF-8) for content hashing")
+    parser.add_argument('--hash', action='store_true', help="Print the SHA-256 of each input's canonical form")
+    parser.add_argument('--indent', type=int, default=4, help="Indentation for pretty output (default: 4)")
+    parser.add_argument('--backend', choices=["auto", "json", "orjson"], default="auto",
+                        help="JSON library to use (default: orjson if installed, else json)")
+    parser.add_argument('--ndjson', action='store_true', help="Treat every input as JSON Lines (one record per line)")
+    parser.add_argument('--output-dir', type=Path, help="Write reformatted files here (batch mode)")
+    parser.add_argument('--workers', type=int, help="Worker processes for batch mode (default: CPU count)")
+    parser.add_argument('--report', type=str, help="Write per-file results as JSON lines to this file")
+    parser.add_argument('--benchmark', nargs='?', const="batch", choices=["batch", "backends"],
+                        help="Benchmark batch validation or compare JSON backends on generated data")
     args = parser.parse_args()
 
-    success = format_json(args.input, args.output)
+    if args.backend != "auto" and args.backend not in BACKENDS:
+        parser.error(f"--backend {args.backend} requires the {args.backend} package")
+    if args.benchmark == "backends":
+        run_backend_benchmark(args.indent)
+        return
+    if args.benchmark:
+        run_benchmark(workers=args.workers)
+        return
+    if not args.input:
+        parser.error("--input is required")
+    if args.stream and (args.canonical or args.hash):
+        parser.error("--canonical and --hash need the parsed document; drop --stream")
+    style = "canonical" if args.canonical else "minify" if args.minify else "pretty"
+
+    batch = (len(args.input) > 1 or glob.has_magic(args.input[0]) or os.path.isdir(args.input[0]) or
+             args.ndjson or args.output_dir or args.workers or args.report)
+    if batch:
+        if args.output:
+            parser.error("--output takes a single input; use --output-dir in batch mode")
+        success = batch_format(args.input, args.output_dir, args.ndjson, style, args.stream,
+                               args.workers, args.report, backend=args.backend, digest=args.hash,
+                               indent=args.indent)
+    elif args.stream:
+        success = stream_format_json(Path(args.input[0]), args.output, args.indent, minify=args.minify)
+    else:
+        success = format_json(Path(args.input[0]), args.output, args.minify, args.canonical, args.indent,
+                              args.backend, args.hash)
     if not success:
         sys.exit(1)
 
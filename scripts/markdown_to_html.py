@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Convert Markdown files to HTML with syntax highlighting.
-Default CSS file is style.css 
+Default CSS file is style.css
 
 Dependencies:
     pip install markdown pygments
@@ -15,80 +15,410 @@ Usage:
 
     # Optional custom CSS
     python scripts/markdown_to_html.py -i README.md -o README.html -t "My Page" --css style.css
+
+    # Build a whole docs tree into site/, only converting pages that changed
+    python scripts/markdown_to_html.py -i docs/ -o site/ --css style.css --workers 8
+
+    # Link every page to one shared, content-hashed stylesheet instead of inlining it
+    python scripts/markdown_to_html.py -i docs/ -o site/ --css style.css --external-css
+
+A directory input is built into a mirror tree of .html files. The output
+directory keeps a manifest of source content hashes, so a rebuild only
+converts new or modified pages and removes pages whose source disappeared.
+Changing the title, CSS or extensions invalidates the whole manifest.
+
+Highlighted code blocks are memoized in an SQLite cache (by default
+<output>/.highlight_cache.sqlite3 for directory builds, or --highlight-cache
+for single files), keyed by the code, its language and the highlighting
+options. A hit skips Pygments lexing entirely; the least recently used
+fragments are evicted once the cache exceeds --cache-size MB.
+
+--external-css writes the custom and Pygments CSS once as style.<hash>.css
+(in the output directory, or next to a single output file) and links it from
+each page. The name changes whenever the CSS does, so it can be cached by
+browsers indefinitely.
 """
 
 import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 import markdown
+from markdown.extensions import codehilite, fenced_code
+import pygments
 from pygments.formatters import HtmlFormatter
 
-def convert_md_to_html(
-    md_file: Path,
-    output_file: Path,
-    page_title: str = "",
-    css_file: Path = None,
-):
-    if not md_file.exists():
-        print(f"Error: {md_file} does not exist.")
-        return
+EXTENSIONS = ["fenced_code", "codehilite", "tables"]
+PYGMENTS_STYLE = "monokai"
+MANIFEST_NAME = ".md_manifest.json"
+HIGHLIGHT_CACHE_NAME = ".highlight_cache.sqlite3"
+DEFAULT_CACHE_MB = 64
 
-    text = md_file.read_text(encoding="utf-8")
+_converter = None
+_worker_page = (None, None)
+
+class HighlightCache:
+    """Highlighted code-block HTML stored in SQLite with least-recently-used eviction.
 
-    # Syntax highlighting using pygments
-    extensions = ["fenced_code", "codehilite", "tables"]
-    md = markdown.Markdown(extensions=extensions)
+    Build workers open the database read-only and collect what they computed or
+    hit; the parent process merges that with merge() so there is a single writer.
+    """
 
-    html_content = md.convert(text)
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_CACHE_MB << 20, readonly: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        if readonly:
+            self.db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+        else:
+            self.db = sqlite3.connect(path, timeout=30)
+            # Lets build workers read while the parent writes
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("""CREATE TABLE IF NOT EXISTS fragments
+                               (key TEXT PRIMARY KEY, html TEXT NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)""")
+            self.db.commit()
+        self.memory = {}
+        self.new = {}
+        self.used = set()
+        self.hits = self.misses = self.evicted = 0
 
-    # Add CSS
+    def get(self, key: str):
+        html = self.memory.get(key)
+        if html is None:
+            row = self.db.execute("SELECT html FROM fragments WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            html = self.memory[key] = row[0]
+        self.hits += 1
+        self.used.add(key)
+        return html
+
+    def put(self, key: str, html: str):
+        self.memory[key] = html
+        self.new[key] = html
+
+    def drain(self):
+        """Return and forget (new fragments, keys hit, hits, misses) since the last drain."""
+        delta = (self.new, self.used, self.hits, self.misses)
+        self.new, self.used = {}, set()
+        self.hits = self.misses = 0
+        return delta
+
+    def _write(self, new, used):
+        now = time.time()
+        self.db.executemany("INSERT OR REPLACE INTO fragments VALUES (?, ?, ?, ?)",
+                            [(key, html, len(html), now) for key, html in new.items()])
+        self.db.executemany("UPDATE fragments SET used = ? WHERE key = ?", [(now, key) for key in used])
+
+    def merge(self, delta):
+        """Record a worker's drained fragments, hits and misses."""
+        new, used, hits, misses = delta
+        self._write(new, used)
+        self.hits += hits
+        self.misses += misses
+
+    def flush(self) -> int:
+        """Write this process's own additions, evict down to max_bytes, commit and return the stored size."""
+        self._write(self.new, self.used)
+        self.new, self.used = {}, set()
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM fragments").fetchone()[0]
+        if total > self.max_bytes:
+            stale = []
+            for key, size in self.db.execute("SELECT key, size FROM fragments ORDER BY used"):
+                if total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+            self.db.executemany("DELETE FROM fragments WHERE key = ?", stale)
+            self.evicted += len(stale)
+        self.db.commit()
+        return total
+
+    def close(self):
+        self.db.close()
+
+    def summary(self, stored: int) -> str:
+        lookups = self.hits + self.misses
+        rate = 100 * self.hits / lookups if lookups else 0
+        return (f"highlight cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate), "
+                f"{self.evicted} evicted, {stored / 1e6:.1f} MB stored")
+
+class CachedCodeHilite(codehilite.CodeHilite):
+    """CodeHilite that consults the process's HighlightCache before running Pygments."""
+    cache = None
+
+    def cache_key(self, shebang: bool) -> str:
+        formatter = getattr(self.pygments_formatter, "__qualname__", self.pygments_formatter)
+        options = [pygments.__version__, markdown.__version__, self.lang, self.guess_lang, self.use_pygments,
+                   self.lang_prefix, formatter, sorted(self.options.items()), shebang]
+        digest = hashlib.sha256(repr(options).encode("utf-8"))
+        digest.update(self.src.encode("utf-8"))
+        return digest.hexdigest()
+
+    def hilite(self, shebang: bool = True) -> str:
+        cache = CachedCodeHilite.cache
+        if cache is None:
+            return super().hilite(shebang)
+        key = self.cache_key(shebang)
+        html = cache.get(key)
+        if html is None:
+            html = super().hilite(shebang)
+            cache.put(key, html)
+        return html
+
+# fenced_code and codehilite look CodeHilite up as a module global for every block
+codehilite.CodeHilite = fenced_code.CodeHilite = CachedCodeHilite
+
+@lru_cache(maxsize=None)
+def highlight_css(style: str = PYGMENTS_STYLE) -> str:
+    return HtmlFormatter(style=style).get_style_defs(".codehilite")
+
+def page_style(css_file: Path = None) -> str:
     style = ""
     if css_file and css_file.exists():
         style += css_file.read_text(encoding="utf-8") + "\n"
 
     # Add pygments CSS (built-in style 'monokai')
-    formatter = HtmlFormatter(style="monokai")
-    style += formatter.get_style_defs(".codehilite")
+    return style + highlight_css()
+
+def get_converter() -> markdown.Markdown:
+    """Return this process's Markdown instance, reset for a new document."""
+    global _converter
+    if _converter is None:
+        # Syntax highlighting using pygments
+        _converter = markdown.Markdown(extensions=EXTENSIONS)
+    return _converter.reset()
+
+def write_stylesheet(directory: Path, style: str) -> Path:
+    """Write style to a content-hashed file in directory (once) and return its path."""
+    data = style.encode("utf-8")
+    path = directory / f"style.{hashlib.sha256(data).hexdigest()[:12]}.css"
+    if not path.exists():
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    return path
 
-    # HTML pre/post content
-    pre_content = f"""<html>
+def page_parts(html_content: str, page_title: str, style: str = None, stylesheet: Path = None, page_dir: Path = None):
+    """Yield the page in pieces; link stylesheet (relative to page_dir) or inline style."""
+    yield f"""<html>
 <head>
     <title>{page_title}</title>
     <meta name="viewport" content="width=device-width, initial-scale=1">
     <meta charset="UTF-8">
-</head>
+"""
+    if stylesheet:
+        href = Path(os.path.relpath(stylesheet, page_dir)).as_posix()
+        yield f"""    <link rel="stylesheet" href="{href}">
+"""
+    yield """</head>
 <body>
     <div id='content'>
 """
-
-    post_content = f"""
-    </div>
-    <style type='text/css'>
+    yield html_content
+    yield "\n    </div>\n"
+    if not stylesheet:
+        yield f"""    <style type='text/css'>
 {style}
     </style>
-</body>
+"""
+    yield """</body>
 </html>
 """
 
-    html = pre_content + html_content + post_content
+def write_page(output_file: Path, html_content: str, page_title: str, style: str = None, stylesheet: Path = None):
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.writelines(page_parts(html_content, page_title, style, stylesheet, output_file.parent))
+
+def convert_md_to_html(
+    md_file: Path,
+    output_file: Path,
+    page_title: str = "",
+    css_file: Path = None,
+    force: bool = False,
+    highlight_cache: Path = None,
+    cache_bytes: int = DEFAULT_CACHE_MB << 20,
+    external_css: bool = False,
+):
+    if not md_file.exists():
+        print(f"Error: {md_file} does not exist.")
+        return
 
-    if output_file.exists():
+    if output_file.exists() and not force:
         print(f"File '{output_file}' already exists. Aborted!")
         return
 
-    output_file.write_text(html, encoding="utf-8")
+    text = md_file.read_text(encoding="utf-8")
+    if highlight_cache:
+        CachedCodeHilite.cache = HighlightCache(highlight_cache, cache_bytes)
+    html_content = get_converter().convert(text)
+    if highlight_cache:
+        CachedCodeHilite.cache.flush()
+        CachedCodeHilite.cache.close()
+        CachedCodeHilite.cache = None
+
+    style = page_style(css_file)
+    stylesheet = write_stylesheet(output_file.parent, style) if external_css else None
+    write_page(output_file, html_content, page_title, style, stylesheet)
     print(f"Done, saved to {output_file}")
 
+def _init_build_worker(style, stylesheet=None, cache_path=None):
+    global _worker_page
+    _worker_page = (style, stylesheet)
+    if cache_path:
+        CachedCodeHilite.cache = HighlightCache(cache_path, readonly=True)
+
+def _build_page(job):
+    """Convert one page inside a worker; returns (error message or None, highlight cache delta)."""
+    md_file, output_file, page_title = job
+    cache = CachedCodeHilite.cache
+    try:
+        html_content = get_converter().convert(md_file.read_text(encoding="utf-8"))
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        write_page(output_file, html_content, page_title, *_worker_page)
+    except Exception as e:
+        return f"{md_file}: {e}", cache and cache.drain()
+    return None, cache and cache.drain()
+
+def load_manifest(path: Path) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(path: Path, manifest: dict):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def build_site(
+    src_dir: Path,
+    out_dir: Path,
+    page_title: str = "",
+    css_file: Path = None,
+    workers: int = None,
+    force: bool = False,
+    highlight_cache: Path = None,
+    cache_bytes: int = DEFAULT_CACHE_MB << 20,
+    external_css: bool = False,
+):
+    """Convert every .md file under src_dir, skipping pages whose source hash is unchanged."""
+    start = time.perf_counter()
+    style = page_style(css_file)
+    settings = hashlib.sha256(json.dumps([style, page_title, EXTENSIONS, external_css]).encode("utf-8")).hexdigest()
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / MANIFEST_NAME
+    manifest = load_manifest(manifest_path)
+    stylesheet = write_stylesheet(out_dir, style) if external_css else None
+    old_stylesheet = manifest.get("stylesheet")
+    if old_stylesheet and old_stylesheet != (stylesheet and stylesheet.name):
+        (out_dir / old_stylesheet).unlink(missing_ok=True)
+    old_files = manifest.get("files", {})
+    # Pages are only reused under the same settings, but stale ones are found from the full old manifest
+    reusable = old_files if manifest.get("settings") == settings and not force else {}
+
+    files = {}
+    jobs = []
+    for md_file in sorted(src_dir.rglob("*.md")):
+        rel = md_file.relative_to(src_dir).as_posix()
+        digest = hashlib.sha256(md_file.read_bytes()).hexdigest()
+        output_file = out_dir / Path(rel).with_suffix(".html")
+        if reusable.get(rel) == digest and output_file.exists():
+            files[rel] = digest
+        else:
+            jobs.append((md_file, output_file, page_title or md_file.stem, rel, digest))
+    unchanged = len(files)
+
+    removed = 0
+    for rel in old_files.keys() - {job[3] for job in jobs} - files.keys():
+        stale = out_dir / Path(rel).with_suffix(".html")
+        if stale.exists():
+            stale.unlink()
+        removed += 1
+
+    # files keeps filling in as pages finish, so a failed build still records its progress
+    new_manifest = {"settings": settings, "files": files, "stylesheet": stylesheet and stylesheet.name}
+    errors = []
+    cache = HighlightCache(highlight_cache, cache_bytes) if highlight_cache else None
+    if jobs:
+        page_jobs = [job[:3] for job in jobs]
+        if workers == 1 or len(jobs) == 1:
+            _init_build_worker(style, stylesheet)
+            CachedCodeHilite.cache = cache
+            results = map(_build_page, page_jobs)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_build_worker,
+                                       initargs=(style, stylesheet, highlight_cache))
+            chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 8))
+            results = pool.map(_build_page, page_jobs, chunksize=chunksize)
+        try:
+            for job, (error, delta) in zip(jobs, results):
+                if delta:
+                    cache.merge(delta)
+                if error:
+                    errors.append(error)
+                else:
+                    files[job[3]] = job[4]
+        finally:
+            if pool:
+                pool.shutdown()
+            CachedCodeHilite.cache = None
+            save_manifest(manifest_path, new_manifest)
+    else:
+        save_manifest(manifest_path, new_manifest)
+
+    for error in errors:
+        print(f"Error: {error}")
+    elapsed = time.perf_counter() - start
+    print(f"{len(files) + len(errors)} pages: {len(jobs) - len(errors)} converted, {unchanged} unchanged, "
+          f"{removed} removed, {len(errors)} failed in {elapsed:.2f}s -> {out_dir}")
+    if cache:
+        print(cache.summary(cache.flush()))
+        cache.close()
+    return not errors
+
 def main():
     parser = argparse.ArgumentParser(description="Convert Markdown to HTML with syntax highlighting")
-    parser.add_argument('--input', '-i', type=Path, default="README.md", help="Markdown file to convert")
-    parser.add_argument('--output', '-o', type=Path, help="Output HTML file path")
-    parser.add_argument('--title', '-t', type=str, default="", help="Page title")
+    parser.add_argument('--input', '-i', type=Path, default="README.md", help="Markdown file or directory to convert")
+    parser.add_argument('--output', '-o', type=Path, help="Output HTML file path (output directory for a directory input)")
+    parser.add_argument('--title', '-t', type=str, default="", help="Page title (default for directories: file name)")
     parser.add_argument('--css', '-c', type=Path, help="Optional CSS file")
+    parser.add_argument('--workers', '-w', type=int, help="Worker processes for directory builds (default: CPU count)")
+    parser.add_argument('--force', '-f', action='store_true',
+                        help="Overwrite an existing output file, or rebuild every page of a directory")
+    parser.add_argument('--highlight-cache', type=Path,
+                        help=f"SQLite cache of highlighted code blocks (default for directories: <output>/{HIGHLIGHT_CACHE_NAME})")
+    parser.add_argument('--no-highlight-cache', action='store_true', help="Always run Pygments on every code block")
+    parser.add_argument('--external-css', action='store_true',
+                        help="Write the CSS once to a content-hashed style.<hash>.css and link it from every page")
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_CACHE_MB,
+                        help=f"Highlight cache size limit in MB (default: {DEFAULT_CACHE_MB})")
     args = parser.parse_args()
+    cache_bytes = int(args.cache_size * (1 << 20))
+
+    if args.input.is_dir():
+        output_dir = args.output or args.input.with_name(args.input.name + "_html")
+        cache_path = None if args.no_highlight_cache else args.highlight_cache or output_dir / HIGHLIGHT_CACHE_NAME
+        if not build_site(args.input, output_dir, args.title, args.css, args.workers, args.force,
+                          cache_path, cache_bytes, args.external_css):
+            raise SystemExit(1)
+        return
 
     output_file = args.output or args.input.with_suffix(".html")
+    cache_path = None if args.no_highlight_cache else args.highlight_cache
 
-    convert_md_to_html(args.input, output_file, args.title, args.css)
+    convert_md_to_html(args.input, output_file, args.title, args.css, args.force, cache_path, cache_bytes,
+                       args.external_css)
 
 if __name__ == "__main__":
     main()
@@ -1,70 +1,639 @@
 #!/usr/bin/env python3
 """
-Monitor and log a process's memory usage over time.
+Monitor and log the memory usage of one or more processes over time.
 
 Dependencies:
     pip install psutil
 
 Usage Examples:
     # Monitor process with PID 1234, log every 2 seconds to mem.csv
-    python memory_logger.py --pid 1234
+    python mem_watch.py --pid 1234
 
     # Monitor with a custom interval of 1 second and output file memory_log.csv
-    python memory_logger.py --pid 1234 --interval 1 --out memory_log.csv
+    python mem_watch.py --pid 1234 --interval 1 --out memory_log.csv
 
     # Show live memory usage in the terminal while logging
-    python memory_logger.py --pid 1234 --live
+    python mem_watch.py --pid 1234 --live
+
+    # A build and every process it spawns, sampled at 50 Hz
+    python mem_watch.py --tree 1234 --interval 0.02
+
+    # Several PIDs, plus every process whose name matches a pattern
+    python mem_watch.py --pid 1234 5678 --name "python*" --name "postgres*"
+
+    # A week-long capture in compact binary form, kept as 1-minute min/max/avg buckets
+    python mem_watch.py --tree 1234 --interval 0.1 --out week.bin --downsample 60
+
+    # Summarize a binary capture, or convert it to hourly buckets in CSV
+    python mem_watch.py --read week.bin
+    python mem_watch.py --read week.bin --downsample 3600 --out week_hourly.csv
 
 CLI Arguments:
-    --pid       : Process ID to monitor (required)
+    --pid       : Process IDs to monitor
+    --tree      : Process IDs to monitor together with all their descendants
+    --name      : Monitor processes whose name or command line matches this glob (repeatable)
     --interval  : Interval in seconds between samples (default: 2)
-    --out       : Output CSV file name (default: mem.csv)
+    --out       : Output file name (default: mem.csv)
+    --format    : csv or bin (default: bin for .bin files, csv otherwise)
+    --downsample: Write per-process min/max/avg over buckets of this many seconds instead of every sample
+    --read      : Summarize a binary capture (or convert it with --out and --downsample)
     --live      : Show live memory usage in terminal
+    --fast      : Read only RSS and VMS (statm), skipping PSS/USS/swap (smaps_rollup)
+    --rescan    : Seconds between looking for new processes to watch (default: 1)
+    --flush     : Seconds between writes of buffered samples to disk (default: 5)
+    --buffer    : Samples held in memory between writes (default: 65536)
+
+Samples are read straight from /proc/<pid>/statm and /proc/<pid>/smaps_rollup
+through file descriptors opened once per process, so a sample costs one pread()
+per file rather than an open/read/close. They go into a fixed-size ring buffer
+and are written to disk in batches; if writes fall so far behind that the
+buffer fills, the oldest samples are dropped and the count is reported.
+psutil is only used to discover processes, every --rescan seconds, except on
+systems without /proc (macOS, Windows), where it also reads the samples through
+memory_info(), or memory_full_info() for USS unless --fast is given.
+
+The binary format is a 24-byte header followed by fixed-width little-endian
+records of 36 bytes (sizes in KiB, all ones for a stat that was not read),
+which need no parsing to load. Process names go in a <out>.names.json sidecar.
+read_samples() memory-maps a capture into a NumPy structured array and
+downsample() folds it, or an already downsampled capture, into coarser buckets
+chunk by chunk, so week-long captures load and plot without parsing text.
 """
 
 import argparse
 import csv
+import fnmatch
+import json
+import os
+import signal
+import struct
 import time
 import psutil
 import sys
+from array import array
 from datetime import datetime
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# /proc is Linux-only; elsewhere (macOS, Windows) samples come from psutil instead
+HAVE_PROC = os.path.exists("/proc/self/statm")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if HAVE_PROC else 4096
+# Per-sample columns held in the ring buffer; -1 marks a stat that was not read
+COLUMNS = ['time_ns', 'pid', 'rss', 'vms', 'pss', 'uss', 'swap']
+# Stats and their struct codes in binary captures, in KiB: 32 bits covers 4 TiB, but VMS can exceed that
+STATS = [('rss', 'I'), ('vms', 'Q'), ('pss', 'I'), ('uss', 'I'), ('swap', 'I')]
+MISSING = {'I': 0xFFFFFFFF, 'Q': 0xFFFFFFFFFFFFFFFF}
+MAGIC = b"MEMWATCH"
+FORMAT_VERSION = 1
+AGGREGATED = 1
+HEADER = struct.Struct('<8sIIQ')    # magic, version, flags, bucket width in ns
+
+class ProcReader:
+    """Reads one process's memory stats from /proc with descriptors kept open between samples."""
+
+    def __init__(self, pid, detailed=True):
+        self.pid = pid
+        self.statm = os.open(f"/proc/{pid}/statm", os.O_RDONLY)
+        self.smaps = None
+        if detailed:
+            try:
+                self.smaps = os.open(f"/proc/{pid}/smaps_rollup", os.O_RDONLY)
+            except (PermissionError, FileNotFoundError):
+                # Another user's process, or a kernel older than 4.14: RSS and VMS only
+                pass
+
+    def read(self):
+        """Return (rss, vms, pss, uss, swap) in bytes; raises ProcessLookupError once the process exits."""
+        # Reading at offset 0 makes the kernel regenerate the file, so the descriptors never need reopening
+        statm = os.pread(self.statm, 128, 0)
+        if not statm:
+            raise ProcessLookupError(self.pid)
+        size, resident = statm.split(maxsplit=2)[:2]
+        rss, vms = int(resident) * PAGE_SIZE, int(size) * PAGE_SIZE
+        if self.smaps is None:
+            return rss, vms, -1, -1, -1
+        data = os.pread(self.smaps, 4096, 0)
+        # After the address-range header every line is "Key:  value kB"
+        fields = data[data.find(b"\n"):].split()
+        stats = dict(zip(fields[::3], fields[1::3]))
+        uss = sum(int(stats.get(key, 0)) for key in (b"Private_Clean:", b"Private_Dirty:", b"Private_Hugetlb:"))
+        return rss, vms, int(stats.get(b"Pss:", 0)) << 10, uss << 10, int(stats.get(b"Swap:", 0)) << 10
+
+    def close(self):
+        for fd in (self.statm, self.smaps):
+            if fd is not None:
+                os.close(fd)
+
+class PsutilReader:
+    """Fallback reader for systems without /proc, through psutil's memory_info()/memory_full_info()."""
+
+    def __init__(self, pid, detailed=True):
+        self.pid = pid
+        try:
+            self.proc = psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            raise ProcessLookupError(pid) from None
+        self.detailed = detailed
+
+    def read(self):
+        """Return (rss, vms, pss, uss, swap) in bytes, -1 for what the platform does not report."""
+        try:
+            if self.detailed:
+                try:
+                    info = self.proc.memory_full_info()
+                    return (info.rss, info.vms, getattr(info, 'pss', -1), info.uss, getattr(info, 'swap', -1))
+                except psutil.AccessDenied:
+                    # Another user's process: USS needs more privileges than RSS
+                    self.detailed = False
+            info = self.proc.memory_info()
+        except psutil.NoSuchProcess:
+            raise ProcessLookupError(self.pid) from None
+        return info.rss, info.vms, -1, -1, -1
+
+    def close(self):
+        pass
+
+def open_reader(pid, detailed=True):
+    """A reader for one process; raises ProcessLookupError or FileNotFoundError if it is already gone."""
+    return ProcReader(pid, detailed) if HAVE_PROC else PsutilReader(pid, detailed)
+
+class RingBuffer:
+    """Fixed-size sample store: preallocated integer columns written round-robin."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.columns = [array('q', bytes(8 * capacity)) for _ in COLUMNS]
+        self.written = 0    # samples ever appended
+        self.drained = 0    # samples ever handed out by drain()
+        self.dropped = 0
+
+    def append(self, sample):
+        i = self.written % self.capacity
+        for column, value in zip(self.columns, sample):
+            column[i] = value
+        self.written += 1
+
+    def __len__(self):
+        return self.written - self.drained
+
+    def drain(self):
+        """Return the samples appended since the last drain as rows, oldest first."""
+        start = max(self.drained, self.written - self.capacity)
+        self.dropped += start - self.drained
+        rows = []
+        for n in range(start, self.written):
+            i = n % self.capacity
+            rows.append(tuple(column[i] for column in self.columns))
+        self.drained = self.written
+        return rows
+
+def record_layout(aggregated=False):
+    """[(field, struct code)] of a binary record; rows passed to sinks hold the same fields in bytes."""
+    fields = [('time_ns', 'q'), ('pid', 'I')]
+    if not aggregated:
+        return fields + STATS
+    fields.append(('samples', 'I'))
+    return fields + [(f'{name}_{kind}', code) for name, code in STATS for kind in ('min', 'max', 'avg')]
+
+def record_dtype(aggregated=False):
+    return np.dtype([(name, '<' + code) for name, code in record_layout(aggregated)])
+
+def names_path(path):
+    return f"{path}.names.json"
+
+class CsvSink:
+    """Writes drained samples as CSV rows, formatting timestamps only at write time."""
+
+    def __init__(self, path, bucket_ns=0):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(['timestamp', 'pid', 'name'] + [name for name, _ in record_layout(bool(bucket_ns))[2:]])
+
+    def write(self, rows, names):
+        self.writer.writerows(
+            (datetime.fromtimestamp(t / 1e9).isoformat(), pid, names.get(pid, ''),
+             *(value if value >= 0 else '' for value in stats))
+            for t, pid, *stats in rows
+        )
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class BinarySink:
+    """Writes drained samples as fixed-width binary records that read_samples() can memory-map."""
+
+    def __init__(self, path, bucket_ns=0):
+        layout = record_layout(bool(bucket_ns))
+        self.record = struct.Struct('<' + ''.join(code for _, code in layout))
+        # Sizes are stored in KiB and clamped below the all-ones "not read" marker
+        self.limits = [(MISSING[code], 0 if name == 'samples' else 10) for name, code in layout[2:]]
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, FORMAT_VERSION, AGGREGATED if bucket_ns else 0, bucket_ns))
+        self.named = 0
+
+    def write(self, rows, names):
+        pack, limits = self.record.pack, self.limits
+        self.file.write(b"".join(
+            pack(t, pid, *(missing if value < 0 else min(value >> shift, missing - 1)
+                           for value, (missing, shift) in zip(values, limits)))
+            for t, pid, *values in rows
+        ))
+        self.file.flush()
+        self.write_names(names)
+
+    def write_records(self, records, names):
+        """Append a structured array that already has this sink's layout."""
+        records.tofile(self.file)
+        self.file.flush()
+        self.write_names(names)
+
+    def write_names(self, names):
+        if len(names) == self.named:
+            return
+        tmp = names_path(self.path) + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump({str(pid): name for pid, name in names.items()}, f)
+        os.replace(tmp, names_path(self.path))
+        self.named = len(names)
+
+    def close(self):
+        self.file.close()
+
+class Downsampler:
+    """Folds samples into per-process min/max/avg buckets before handing them to a sink."""
+
+    def __init__(self, sink, bucket_ns):
+        self.sink = sink
+        self.bucket_ns = bucket_ns
+        self.open = {}      # pid -> [bucket, samples, mins, maxs, sums]
+        self.names = {}
+
+    def _close_bucket(self, pid, state):
+        bucket, samples, mins, maxs, sums = state
+        stats = [x for triple in zip(mins, maxs, (total // samples for total in sums)) for x in triple]
+        return (bucket * self.bucket_ns, pid, samples, *stats)
+
+    def write(self, rows, names):
+        self.names = names
+        done = []
+        latest = None
+        for t, pid, *values in rows:
+            bucket = t // self.bucket_ns
+            state = self.open.get(pid)
+            if state is not None and state[0] != bucket:
+                done.append(self._close_bucket(pid, state))
+                state = None
+            if state is None:
+                self.open[pid] = [bucket, 1, list(values), list(values), list(values)]
+            else:
+                state[1] += 1
+                mins, maxs, sums = state[2:]
+                for i, value in enumerate(values):
+                    if value < mins[i]:
+                        mins[i] = value
+                    elif value > maxs[i]:
+                        maxs[i] = value
+                    sums[i] += value
+            latest = bucket
+        # A process that is no longer sampled closes its bucket once time has moved past it
+        for pid, state in list(self.open.items()):
+            if latest is not None and state[0] < latest:
+                done.append(self._close_bucket(pid, self.open.pop(pid)))
+        if done:
+            self.sink.write(done, names)
+
+    def close(self):
+        done = [self._close_bucket(pid, state) for pid, state in self.open.items()]
+        self.open.clear()
+        if done:
+            self.sink.write(done, self.names)
+        self.sink.close()
+
+def open_sink(path, fmt=None, downsample=0):
+    """CSV or binary sink for path (binary for .bin unless fmt says otherwise), downsampled if asked."""
+    fmt = fmt or ('bin' if path.endswith('.bin') else 'csv')
+    bucket_ns = int(downsample * 1e9)
+    sink = (BinarySink if fmt == 'bin' else CsvSink)(path, bucket_ns)
+    return Downsampler(sink, bucket_ns) if bucket_ns else sink
+
+def read_samples(path):
+    """Memory-map a binary capture: return (records with sizes in KiB, {pid: name}, bucket width in ns)."""
+    if np is None:
+        raise ImportError("Reading binary captures requires NumPy: pip install numpy")
+    with open(path, 'rb') as f:
+        magic, version, flags, bucket_ns = HEADER.unpack(f.read(HEADER.size).ljust(HEADER.size, b"\0"))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a mem_watch binary capture")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path} has format version {version}; this mem_watch reads version {FORMAT_VERSION}")
+    dtype = record_dtype(bool(flags & AGGREGATED))
+    # A record cut short by a crash mid-write is ignored
+    count = (os.path.getsize(path) - HEADER.size) // dtype.itemsize
+    records = np.memmap(path, dtype, 'r', HEADER.size, (count,)) if count else np.empty(0, dtype)
+    try:
+        with open(names_path(path)) as f:
+            names = {int(pid): name for pid, name in json.load(f).items()}
+    except FileNotFoundError:
+        names = {}
+    return records, names, bucket_ns
+
+def _downsample(records, bucket_ns):
+    aggregated = 'samples' in records.dtype.names
+    buckets = records['time_ns'] // bucket_ns
+    # One integer key per (bucket, process): a single sort is much cheaper than a lexsort of the records
+    keys = ((buckets - buckets.min()) << 32) | records['pid']
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    first = order[starts]
+    out = np.empty(len(starts), record_dtype(True))
+    out['time_ns'] = buckets[first] * bucket_ns
+    out['pid'] = records['pid'][first]
+    weights = records['samples'][order].astype(np.uint64) if aggregated else None
+    samples = np.add.reduceat(weights, starts) if aggregated else np.diff(np.r_[starts, len(keys)]).astype(np.uint64)
+    out['samples'] = samples
+    for name, code in STATS:
+        if aggregated:
+            lows, highs = records[f'{name}_min'][order], records[f'{name}_max'][order]
+            totals = np.add.reduceat(records[f'{name}_avg'][order] * weights, starts)
+        else:
+            lows = highs = records[name][order]
+            totals = np.add.reduceat(lows, starts, dtype=np.uint64)
+        out[f'{name}_min'] = np.minimum.reduceat(lows, starts)
+        out[f'{name}_max'] = np.maximum.reduceat(highs, starts)
+        out[f'{name}_avg'] = (totals + samples // 2) // samples
+        # A stat is read for every sample of a process or for none, so its total is only meaningless when
+        # the minimum is the "not read" marker too
+        out[f'{name}_avg'][out[f'{name}_min'] == MISSING[code]] = MISSING[code]
+    return out
+
+def downsample(records, bucket_ns, chunk=1 << 22):
+    """Fold raw or downsampled records into per-process min/max/avg buckets of bucket_ns, ordered by time.
+
+    The records are processed chunk by chunk, so a memory-mapped capture never has to fit in memory
+    whole; buckets split across chunks are merged by a final pass over the much smaller result.
+    """
+    if not len(records):
+        return np.empty(0, record_dtype(True))
+    parts = [_downsample(records[i:i + chunk], bucket_ns) for i in range(0, len(records), chunk)]
+    out = parts[0] if len(parts) == 1 else _downsample(np.concatenate(parts), bucket_ns)
+    return out[np.lexsort((out['pid'], out['time_ns']))]
+
+def _rows(records):
+    """Structured records back into sink rows: sizes in bytes, -1 where a stat was not read."""
+    layout = record_layout('samples' in records.dtype.names)
+    for record in records.tolist():
+        t, pid, *values = record
+        yield (t, pid, *(-1 if value == MISSING[code] else value if name == 'samples' else value << 10
+                         for value, (name, code) in zip(values, layout[2:])))
+
+def summarize_capture(path, out=None, fmt=None, downsample_s=0):
+    """Print a per-process summary of a binary capture, or convert it (optionally downsampled) to out."""
+    records, names, bucket_ns = read_samples(path)
+    if out:
+        target_ns = int(downsample_s * 1e9)
+        if target_ns:
+            records = downsample(records, target_ns)
+        if (fmt or ('bin' if out.endswith('.bin') else 'csv')) == 'bin':
+            sink = BinarySink(out, target_ns or bucket_ns)
+            sink.write_records(records, names)
+        else:
+            sink = CsvSink(out, target_ns or bucket_ns)
+            sink.write(_rows(records), names)
+        sink.close()
+        print(f"Wrote {len(records)} records to {out}")
+        return
+    # Buckets this wide put every process's whole capture in a single bucket
+    totals = downsample(records, 1 << 62)
+    first = datetime.fromtimestamp(records['time_ns'].min() / 1e9).isoformat() if len(records) else '-'
+    last = datetime.fromtimestamp(records['time_ns'].max() / 1e9).isoformat() if len(records) else '-'
+    print(f"{path}: {len(records)} records from {first} to {last}")
+    print(f"{'PID':>8} {'Name':<20} {'Samples':>9} {'Peak RSS':>12} {'Avg RSS':>12} {'Peak USS':>12}  (KiB)")
+    for row in totals[np.argsort(-totals['rss_max'].astype(np.int64))]:
+        peak_uss = '-' if row['uss_max'] == MISSING['I'] else row['uss_max']
+        print(f"{row['pid']:>8} {names.get(int(row['pid']), ''):<20.20} {row['samples']:>9} "
+              f"{row['rss_max']:>12} {row['rss_avg']:>12} {peak_uss:>12}")
+
+def _describe(proc):
+    """Return (name, create time) of a psutil process; raises psutil.NoSuchProcess once it has exited."""
+    created = proc.create_time()
+    try:
+        name = proc.name()
+    except psutil.AccessDenied:
+        name = ''
+    return name, created
+
+class Targets:
+    """The set of PIDs to watch: fixed PIDs, whole process trees and name patterns."""
+
+    def __init__(self, pids=(), trees=(), patterns=()):
+        self.pids = set(pids)
+        self.trees = set(trees)
+        self.patterns = list(patterns)
+        # Once a given PID exits, the kernel may hand its number to an unrelated process
+        self.create_times = {}
+        for pid in self.pids | self.trees:
+            try:
+                self.create_times[pid] = psutil.Process(pid).create_time()
+            except psutil.Error:
+                pass
+
+    def _original(self, proc):
+        return self.create_times.get(proc.pid) in (None, proc.create_time())
+
+    @property
+    def open_ended(self):
+        """Name patterns may match processes that have not started yet, so watching never runs out."""
+        return bool(self.patterns)
+
+    def discover(self):
+        """Return {pid: (name, create time)} for every process currently matching the targets."""
+        found = {}
+        for pid in self.pids:
+            found[pid] = None
+        for root in self.trees:
+            try:
+                proc = psutil.Process(root)
+                if not self._original(proc):
+                    continue
+                found[root] = None
+                found.update((child.pid, None) for child in proc.children(recursive=True))
+            except psutil.NoSuchProcess:
+                continue
+        if self.patterns:
+            me = os.getpid()
+            for proc in psutil.process_iter(['name', 'cmdline', 'create_time']):
+                if proc.pid == me:
+                    continue
+                name = proc.info['name'] or ''
+                cmdline = ' '.join(proc.info['cmdline'] or ())
+                if any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(cmdline, p) for p in self.patterns):
+                    found[proc.pid] = (name, proc.info['create_time'])
+        for pid in [pid for pid, info in found.items() if info is None]:
+            try:
+                proc = psutil.Process(pid)
+                if pid in self.pids and not self._original(proc):
+                    raise psutil.NoSuchProcess(pid)
+                found[pid] = _describe(proc)
+            except psutil.NoSuchProcess:
+                del found[pid]
+            except psutil.Error:
+                found[pid] = ('', None)
+        return found
+
+class Sampler:
+    """Samples every watched process each interval into a ring buffer, flushing it to a sink in batches."""
+
+    def __init__(self, targets, sink, interval=2, detailed=True, rescan=1, flush=5, capacity=65536, live=False):
+        self.targets = targets
+        self.sink = sink
+        self.interval = interval
+        self.detailed = detailed
+        self.rescan = rescan
+        self.flush_every = flush
+        self.buffer = RingBuffer(capacity)
+        self.live = live
+        self.readers = {}
+        self.names = {}
+        self.created = {}   # pid: create time of the process being read
+        self.gone = {}      # pid: create time of a process that exited or could not be opened
+
+    def refresh(self):
+        found = self.targets.discover()
+        # Only PIDs discovery still reports need remembering, which keeps this as small as the target set
+        self.gone = {pid: created for pid, created in self.gone.items() if pid in found}
+        for pid, (name, created) in found.items():
+            # The same PID with another create time is a new process that was handed a recycled number
+            if pid in self.readers or self.gone.get(pid, ()) == created:
+                continue
+            try:
+                self.readers[pid] = open_reader(pid, self.detailed)
+            except (FileNotFoundError, ProcessLookupError):
+                self.gone[pid] = created
+                continue
+            self.gone.pop(pid, None)
+            self.names[pid] = name
+            self.created[pid] = created
+
+    def sample(self):
+        now = time.time_ns()
+        totals = [0, 0]
+        for pid, reader in list(self.readers.items()):
+            try:
+                stats = reader.read()
+            except (ProcessLookupError, FileNotFoundError):
+                # With /proc, PIDs are not reused while a descriptor to the old process is open
+                reader.close()
+                del self.readers[pid]
+                self.gone[pid] = self.created.pop(pid)
+                continue
+            self.buffer.append((now, pid, *stats))
+            totals[0] += stats[0]
+            totals[1] += max(stats[3], 0)
+        return now, totals
+
+    def flush(self):
+        rows = self.buffer.drain()
+        if rows:
+            self.sink.write(rows, self.names)
+
+    def run(self):
+        self.refresh()
+        if not self.readers:
+            print("No matching processes found.")
+            if not self.targets.open_ended:
+                return
+        next_sample = next_rescan = next_flush = time.monotonic()
+        next_rescan += self.rescan
+        next_flush += self.flush_every
+        last_live = 0
+        try:
+            while True:
+                now_ns, (rss, uss) = self.sample()
+                if not self.readers and not self.targets.open_ended:
+                    print("\nProcess ended. Exiting.")
+                    break
+                if self.live and now_ns - last_live >= 250_000_000:
+                    last_live = now_ns
+                    timestamp = datetime.fromtimestamp(now_ns / 1e9).isoformat()
+                    uss_text = f" | USS: {uss}" if self.detailed else ""
+                    print(f"{timestamp} | Processes: {len(self.readers)} | RSS: {rss}{uss_text}   ", end='\r')
+
+                now = time.monotonic()
+                if now >= next_flush or len(self.buffer) >= self.buffer.capacity // 2:
+                    self.flush()
+                    next_flush = now + self.flush_every
+                if now >= next_rescan:
+                    self.refresh()
+                    next_rescan = now + self.rescan
+                # Sleep to an absolute deadline so the sampling rate does not drift with the work done
+                next_sample += self.interval
+                delay = next_sample - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_sample = time.monotonic()
+        except KeyboardInterrupt:
+            print("\nInterrupted by user. Exiting.")
+        finally:
+            self.flush()
+            for reader in self.readers.values():
+                reader.close()
+            if self.buffer.dropped:
+                print(f"Dropped {self.buffer.dropped} samples: disk writes fell behind the sampling rate.")
+
 def parse_args():
-    parser = argparse.ArgumentParser(description="Monitor and log a process's memory usage over time.")
-    parser.add_argument('--pid', type=int, required=True, help='Process ID to monitor')
+    parser = argparse.ArgumentParser(description="Monitor and log the memory usage of processes over time.")
+    parser.add_argument('--pid', type=int, nargs='+', default=[], help='Process IDs to monitor')
+    parser.add_argument('--tree', type=int, nargs='+', default=[],
+                        help='Process IDs to monitor together with all their descendants')
+    parser.add_argument('--name', action='append', default=[],
+                        help='Monitor processes whose name or command line matches this glob (repeatable)')
     parser.add_argument('--interval', type=float, default=2, help='Interval in seconds between samples')
-    parser.add_argument('--out', type=str, default='mem.csv', help='Output CSV file')
+    parser.add_argument('--out', type=str, default=None, help='Output file (default: mem.csv)')
+    parser.add_argument('--format', choices=['csv', 'bin'], default=None,
+                        help='Output format (default: bin for .bin files, csv otherwise)')
+    parser.add_argument('--downsample', type=float, default=0, metavar='SECONDS',
+                        help='Write per-process min/max/avg over buckets of this many seconds')
+    parser.add_argument('--read', metavar='FILE', help='Summarize a binary capture, or convert it with --out')
     parser.add_argument('--live', action='store_true', help='Show live memory usage in terminal')
-    return parser.parse_args()
+    parser.add_argument('--fast', action='store_true',
+                        help='Read only RSS and VMS (statm), skipping PSS/USS/swap (smaps_rollup)')
+    parser.add_argument('--rescan', type=float, default=1, help='Seconds between looking for new processes')
+    parser.add_argument('--flush', type=float, default=5, help='Seconds between writes of buffered samples')
+    parser.add_argument('--buffer', type=int, default=65536, help='Samples held in memory between writes')
+    args = parser.parse_args()
+    if not (args.pid or args.tree or args.name or args.read):
+        parser.error("give at least one of --pid, --tree or --name")
+    return args
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
 
 def main():
     args = parse_args()
+    # Stopped by kill or timeout: still write out the buffered samples
+    signal.signal(signal.SIGTERM, _interrupt)
+    if args.read:
+        summarize_capture(args.read, args.out, args.format, args.downsample)
+        return
+    for pid in args.pid + args.tree:
+        if not psutil.pid_exists(pid):
+            print(f"Process with PID {pid} does not exist.")
+            sys.exit(1)
+
+    targets = Targets(args.pid, args.tree, args.name)
+    sink = open_sink(args.out or 'mem.csv', args.format, args.downsample)
     try:
-        proc = psutil.Process(args.pid)
-    except psutil.NoSuchProcess:
-        print(f"Process with PID {args.pid} does not exist.")
-        sys.exit(1)
-
-    with open(args.out, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(['timestamp', 'rss', 'vms'])
-        while True:
-            try:
-                mem_info = proc.memory_info()
-                timestamp = datetime.now().isoformat()
-                rss = mem_info.rss
-                vms = mem_info.vms
-                writer.writerow([timestamp, rss, vms])
-                csvfile.flush()
-                if args.live:
-                    print(f"{timestamp} | RSS: {rss} | VMS: {vms}", end='\r')
-                time.sleep(args.interval)
-            except psutil.NoSuchProcess:
-                print("\nProcess ended. Exiting.")
-                break
-            except KeyboardInterrupt:
-                print("\nInterrupted by user. Exiting.")
-                break
+        Sampler(targets, sink, args.interval, detailed=not args.fast, rescan=args.rescan,
+                flush=args.flush, capacity=args.buffer, live=args.live).run()
+    finally:
+        sink.close()
 
 if __name__ == "__main__":
     main()
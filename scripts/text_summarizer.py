@@ -8,57 +8,361 @@ Usage:
 
     # Show top 5 most frequent words
     python scripts/text_summarizer.py -i sample.txt --top 5
+
+    # Summarize a whole archive on 8 processes (files, directories and globs)
+    python scripts/text_summarizer.py -i logs/ "dumps/**/*.txt" --workers 8
+
+    # Bound memory on huge vocabularies with an approximate top-N
+    python scripts/text_summarizer.py -i corpus/ --top 20 --approx-top 10000
+
+The file is read in chunks and counted in a single pass, so memory depends on
+the vocabulary size rather than the file size. Paragraphs, sentences and words
+that straddle a chunk boundary are counted exactly as if the whole file had
+been read at once.
+
+With several inputs (or --workers), files are summarized across a process
+pool and the partial summaries are merged. Files larger than --range-size are
+also split into byte ranges, cut just after a line break so no word is
+divided; a paragraph or sentence running across a cut is joined back when the
+ranges are merged. --approx-top K keeps only a Misra-Gries summary of at most
+K words instead of the full Counter; reported counts may be low by at most
+the printed error bound.
 """
 
 import argparse
+import fnmatch
+import glob
+import heapq
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from collections import Counter
 import string
 import sys
 
-def summarize_text(file_path: Path, top_n: int = 5):
-    if not file_path.exists():
-        print(f"Error: {file_path} does not exist.")
-        return False
+CHUNK_SIZE = 1 << 20
+RANGE_SIZE = 64 << 20
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+def _has_text(segment: str) -> bool:
+    return bool(segment) and not segment.isspace()
+
+class FrequentWords:
+    """Misra-Gries summary keeping at most k words.
+
+    Every stored count is at most `error` below the true count, and any word
+    more frequent than `error` is guaranteed to be present. Summaries of
+    separate texts merge with the same guarantee.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.counts = Counter()
+        self.error = 0
+
+    def update(self, words):
+        self.counts.update(words)
+        self._prune()
+
+    def merge(self, other: "FrequentWords"):
+        self.counts.update(other.counts)
+        self.error += other.error
+        self._prune()
+
+    def _prune(self):
+        if len(self.counts) <= self.k:
+            return
+        cut = heapq.nlargest(self.k + 1, self.counts.values())[-1]
+        self.error += cut
+        self.counts = Counter({word: count - cut for word, count in self.counts.items() if count > cut})
+
+    def most_common(self, n: int):
+        return self.counts.most_common(n)
+
+class TextSummary:
+    """Paragraph, sentence and word counts built up from text fed in chunks of any size.
+
+    Only the state of the paragraph/sentence/word that is still open at the end
+    of the last chunk is carried over, so splitting the text differently never
+    changes the result.
+    """
+
+    def __init__(self, approx_top: int = None):
+        self.paragraphs = 0
+        self.sentences = 0
+        self.words = 0
+        self.word_chars = 0
+        self.word_counts = Counter() if approx_top is None else FrequentWords(approx_top)
+        self._paragraph_open = False   # the open paragraph has non-whitespace text
+        self._paragraph_newline = False  # ...and ends with "\n", half of a "\n\n" separator
+        self._sentence_open = False
+        self._word_tail = ""
+        # For merging adjacent ranges: whether the first/last paragraph and sentence have text
+        self.has_break = False
+        self.paragraph_head = False
+        self.paragraph_tail = False
+        self.has_period = False
+        self.sentence_head = False
+        self.sentence_tail = False
+        self.first_char = ""
+        self.last_char = ""
+
+    def feed(self, chunk: str):
+        # Paragraphs: non-blank pieces between "\n\n"
+        parts = (("\n" if self._paragraph_newline else "") + chunk).split("\n\n")
+        last = parts.pop()
+        if parts:
+            first = self._paragraph_open or _has_text(parts[0])
+            if not self.has_break:
+                self.has_break = True
+                self.paragraph_head = first
+            self.paragraphs += first + sum(map(_has_text, parts[1:]))
+            self._paragraph_open = False
+        self._paragraph_open = self._paragraph_open or _has_text(last)
+        self._paragraph_newline = last.endswith("\n")
+        if chunk:
+            self.first_char = self.first_char or chunk[0]
+            self.last_char = chunk[-1]
+
+        # Sentences: non-blank pieces between "."
+        parts = chunk.split(".")
+        last = parts.pop()
+        if parts:
+            first = self._sentence_open or _has_text(parts[0])
+            if not self.has_period:
+                self.has_period = True
+                self.sentence_head = first
+            self.sentences += first + sum(map(_has_text, parts[1:]))
+            self._sentence_open = False
+        self._sentence_open = self._sentence_open or _has_text(last)
 
-    text = file_path.read_text(encoding="utf-8")
+        # Words: whitespace-separated runs once punctuation is removed
+        text = self._word_tail + chunk.translate(PUNCTUATION_TABLE)
+        words = text.split()
+        self._word_tail = words.pop() if words and not text[-1].isspace() else ""
+        self._add_words(words)
 
-    # Paragraphs
-    paragraphs = [p for p in text.split("\n\n") if p.strip()]
-    num_paragraphs = len(paragraphs)
+    def _add_words(self, words):
+        self.words += len(words)
+        self.word_chars += sum(map(len, words))
+        self.word_counts.update(map(str.lower, words))
 
-    # Sentences (split by . ! ?)
-    sentences = [s for s in text.replace("\n", " ").split('.') if s.strip()]
-    num_sentences = len(sentences)
+    def close(self):
+        """Count whatever is still open at the end of the text."""
+        self.paragraphs += self._paragraph_open
+        self.paragraph_tail = self._paragraph_open
+        if not self.has_break:
+            self.paragraph_head = self._paragraph_open
+        self.sentences += self._sentence_open
+        self.sentence_tail = self._sentence_open
+        if not self.has_period:
+            self.sentence_head = self._sentence_open
+        if self._word_tail:
+            self._add_words([self._word_tail])
+        self._paragraph_open = self._paragraph_newline = self._sentence_open = False
+        self._word_tail = ""
 
-    # Words
-    words = text.translate(str.maketrans('', '', string.punctuation)).split()
-    num_words = len(words)
-    avg_word_length = sum(len(w) for w in words) / max(num_words, 1)
+    def merge(self, other: "TextSummary", adjacent: bool = False):
+        """Add a closed summary; adjacent means other's text directly follows this one's."""
+        self.paragraphs += other.paragraphs
+        self.sentences += other.sentences
+        self.words += other.words
+        self.word_chars += other.word_chars
+        if isinstance(self.word_counts, FrequentWords):
+            self.word_counts.merge(other.word_counts)
+        else:
+            self.word_counts.update(other.word_counts)
+        if adjacent:
+            # Newlines on both sides of the cut make a "\n\n" separator; otherwise a
+            # paragraph with text on both sides of it was counted twice
+            separated = self.last_char == "\n" and other.first_char == "\n"
+            self.paragraphs -= self.paragraph_tail and other.paragraph_head and not separated
+            if not self.has_break and not separated:
+                self.paragraph_head = self.paragraph_head or other.paragraph_head
+            if other.has_break or separated:
+                self.paragraph_tail = other.paragraph_tail
+            else:
+                self.paragraph_tail = self.paragraph_tail or other.paragraph_tail
+            self.has_break = self.has_break or other.has_break or separated
+            self.first_char = self.first_char or other.first_char
+            self.last_char = other.last_char or self.last_char
+            # A sentence with text on both sides of the cut was counted twice
+            self.sentences -= self.sentence_tail and other.sentence_head
+            if not self.has_period:
+                self.sentence_head = self.sentence_head or other.sentence_head
+            self.sentence_tail = other.sentence_tail if other.has_period else self.sentence_tail or other.sentence_tail
+            self.has_period = self.has_period or other.has_period
 
-    # Most frequent words
-    word_counts = Counter([w.lower() for w in words])
-    most_common = word_counts.most_common(top_n)
+    @property
+    def avg_word_length(self) -> float:
+        return self.word_chars / max(self.words, 1)
 
+def summarize_stream(f, chunk_size: int = CHUNK_SIZE, approx_top: int = None) -> TextSummary:
+    summary = TextSummary(approx_top)
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        summary.feed(chunk)
+    summary.close()
+    return summary
+
+class _ByteRange(io.RawIOBase):
+    """Read-only view of bytes [start, end) of an open binary file."""
+
+    def __init__(self, f, start: int, end: int):
+        f.seek(start)
+        self.f = f
+        self.remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self.f.readinto(memoryview(b)[:self.remaining]) if self.remaining > 0 else 0
+        self.remaining -= n
+        return n
+
+def range_cut(f, offset: int, size: int) -> int:
+    """Return the position just after the first line break ending at or after offset."""
+    if offset <= 0 or offset >= size:
+        return min(max(offset, 0), size)
+    pos = offset - 1
+    while pos < size:
+        f.seek(pos)
+        # Lines are short next to a chunk, so a small read almost always finds the break
+        block = f.read(1 << 16)
+        i = block.find(b"\n")
+        if i >= 0:
+            return pos + i + 1
+        pos += len(block)
+        if not block:
+            break
+    return size
+
+def summarize_range(path: Path, start: int, end: int, chunk_size: int = CHUNK_SIZE, approx_top: int = None):
+    """Summarize the text between the line-break cuts nearest to byte offsets start and end."""
+    with open(path, "rb") as raw:
+        size = os.fstat(raw.fileno()).st_size
+        start, end = range_cut(raw, start, size), range_cut(raw, end, size)
+        reader = io.BufferedReader(_ByteRange(raw, start, max(start, end)), CHUNK_SIZE)
+        with io.TextIOWrapper(reader, encoding="utf-8") as f:
+            return summarize_stream(f, chunk_size, approx_top)
+
+def _summarize_job(job):
+    index, path, start, end, approx_top = job
+    try:
+        return index, summarize_range(path, start, end, approx_top=approx_top), None
+    except (OSError, UnicodeDecodeError) as e:
+        return index, None, str(e)
+
+def expand_inputs(patterns, include: str = "*"):
+    """Files named directly, matched by glob patterns, or found under directories."""
+    files = []
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            files.extend(p for p in sorted(path.rglob("*")) if p.is_file() and fnmatch.fnmatch(p.name, include))
+        elif glob.has_magic(pattern):
+            files.extend(Path(p) for p in sorted(glob.glob(pattern, recursive=True)) if os.path.isfile(p))
+        else:
+            files.append(path)
+    return files
+
+def summarize_files(files, workers: int = None, range_size: int = RANGE_SIZE, approx_top: int = None):
+    """Summarize files across a process pool; returns (merged summary, [(path, error)])."""
+    jobs = []
+    ranges = []
+    for i, path in enumerate(files):
+        size = path.stat().st_size
+        offsets = list(range(0, size, range_size)) or [0]
+        ranges.append(len(offsets))
+        jobs.extend(((i, r), path, start, start + range_size, approx_top) for r, start in enumerate(offsets))
+
+    total = TextSummary(approx_top)
+    pending = {}
+    errors = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for future in as_completed([pool.submit(_summarize_job, job) for job in jobs]):
+            (i, r), summary, error = future.result()
+            if error:
+                errors.setdefault(i, error)
+            parts = pending.setdefault(i, {})
+            parts[r] = summary
+            if len(parts) < ranges[i]:
+                continue
+            # Every range of this file is in; stitch them together in order
+            del pending[i]
+            if i in errors:
+                continue
+            file_summary = parts[0]
+            for r in range(1, ranges[i]):
+                file_summary.merge(parts[r], adjacent=True)
+            total.merge(file_summary)
+    return total, [(files[i], error) for i, error in sorted(errors.items())]
+
+def print_summary(label: str, summary: TextSummary, top_n: int):
     # Display summary
-    print(f"File: {file_path}")
-    print(f"Paragraphs: {num_paragraphs}")
-    print(f"Sentences: {num_sentences}")
-    print(f"Words: {num_words}")
-    print(f"Average word length: {avg_word_length:.2f}")
-    print(f"Top {top_n} most frequent words:")
-    for word, count in most_common:
+    print(label)
+    print(f"Paragraphs: {summary.paragraphs}")
+    print(f"Sentences: {summary.sentences}")
+    print(f"Words: {summary.words}")
+    print(f"Average word length: {summary.avg_word_length:.2f}")
+    if isinstance(summary.word_counts, FrequentWords):
+        print(f"Top {top_n} most frequent words (approximate, counts may be up to {summary.word_counts.error} low):")
+    else:
+        print(f"Top {top_n} most frequent words:")
+    for word, count in summary.word_counts.most_common(top_n):
         print(f"  {word}: {count}")
 
+def summarize_text(file_path: Path, top_n: int = 5, chunk_size: int = CHUNK_SIZE, approx_top: int = None):
+    if not file_path.exists():
+        print(f"Error: {file_path} does not exist.")
+        return False
+
+    with open(file_path, encoding="utf-8") as f:
+        summary = summarize_stream(f, chunk_size, approx_top)
+
+    print_summary(f"File: {file_path}", summary, top_n)
     return True
 
+def summarize_many(patterns, top_n: int = 5, workers: int = None, range_size: int = RANGE_SIZE,
+                   approx_top: int = None, include: str = "*"):
+    files = expand_inputs(patterns, include)
+    missing = [path for path in files if not path.exists()]
+    for path in missing:
+        print(f"Error: {path} does not exist.")
+    files = [path for path in files if path.exists()]
+    if not files:
+        print("Error: no input files found.")
+        return False
+
+    summary, errors = summarize_files(files, workers, range_size, approx_top)
+    for path, error in errors:
+        print(f"Skipped {path}: {error}")
+
+    print_summary(f"Files: {len(files) - len(errors)}", summary, top_n)
+    return not missing and not errors
+
 def main():
-    parser = argparse.ArgumentParser(description="Summarize a text file")
-    parser.add_argument('--input', '-i', type=Path, required=True, help="Path to text file")
+    parser = argparse.ArgumentParser(description="Summarize text files")
+    parser.add_argument('--input', '-i', nargs='+', required=True, help="Text files, directories or glob patterns")
     parser.add_argument('--top', '-t', type=int, default=5, help="Top N frequent words")
+    parser.add_argument('--workers', '-w', type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument('--range-size', type=int, default=RANGE_SIZE // (1 << 20),
+                        help=f"Split files larger than this many MiB into ranges (default: {RANGE_SIZE >> 20})")
+    parser.add_argument('--approx-top', type=int, metavar='K',
+                        help="Track at most K words approximately instead of an exact Counter")
+    parser.add_argument('--include', default="*", help="File name pattern for files found in directories (default: *)")
     args = parser.parse_args()
 
-    success = summarize_text(args.input, args.top)
+    single = len(args.input) == 1 and not args.workers and Path(args.input[0]).is_file()
+    if single and Path(args.input[0]).stat().st_size <= args.range_size << 20:
+        success = summarize_text(Path(args.input[0]), args.top, approx_top=args.approx_top)
+    else:
+        success = summarize_many(args.input, args.top, args.workers, args.range_size << 20,
+                                 args.approx_top, args.include)
     if not success:
         sys.exit(1)
 